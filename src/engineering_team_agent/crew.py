@@ -2,9 +2,14 @@
 
 import os
 import warnings
-from crewai import Agent, Crew, Process, Task
+from functools import lru_cache
+from typing import Optional
+
+from crewai import LLM, Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 
+from engineering_team_agent.tools.code_interpreter import BoundedCodeInterpreterTool
+
 # Suppress warnings from dependencies
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -12,6 +17,43 @@ warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 # Set ENABLE_CODE_EXECUTION=false to disable (useful for Docker Desktop on macOS)
 ENABLE_CODE_EXECUTION = os.getenv("ENABLE_CODE_EXECUTION", "true").lower() == "true"
 
+# Set CREWAI_VERBOSE=false to silence crewai's console logs (record a trace instead)
+VERBOSE = os.getenv("CREWAI_VERBOSE", "true").lower() == "true"
+
+# Bound how long and how often an agent may execute code, so a bad generated module
+# cannot hold a shared host for long
+MAX_EXECUTION_TIME = int(os.getenv("CREWAI_MAX_EXECUTION_TIME", "500"))
+MAX_RETRY_LIMIT = int(os.getenv("CREWAI_MAX_RETRY_LIMIT", "3"))
+
+# Set ENABLE_PROFILING=true to add the benchmark task that feeds the profiling stage
+ENABLE_PROFILING = os.getenv("ENABLE_PROFILING", "false").lower() == "true"
+
+# Anthropic only caches prompt prefixes explicitly marked with cache_control; OpenAI caches
+# long prefixes automatically. The system prompt is static (see config/agents.yaml), so
+# marking it lets every run reuse the cached prefix. The task prompt and each tool-use turn
+# are appended after it, so marking the last message as well lets every later call of an
+# agent's multi-turn loop reuse the whole conversation so far.
+CACHE_CONTROL_INJECTION_POINTS = [
+    {"location": "message", "role": "system"},
+    {"location": "message", "index": -1},
+]
+
+
+def build_llm(model: str, lane: Optional[str] = None) -> LLM:
+    """Return a shared LLM for a model and lane, with cache-control markers where supported."""
+    return _build_llm(model, lane)
+
+
+@lru_cache(maxsize=None)
+def _build_llm(model: str, lane: Optional[str]) -> LLM:
+    options = {}
+    if model.startswith("anthropic/"):
+        options["cache_control_injection_points"] = CACHE_CONTROL_INJECTION_POINTS
+    if lane:
+        # litellm keeps metadata to itself; traces use it to tell concurrent lanes apart
+        options["metadata"] = {"lane": lane}
+    return LLM(model=model, **options)
+
 
 @CrewBase
 class EngineeringTeam:
@@ -20,12 +62,33 @@ class EngineeringTeam:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
+    def __init__(
+        self,
+        enable_profiling: Optional[bool] = None,
+        backend_model: Optional[str] = None,
+        run_id: Optional[str] = None,
+        lane: Optional[str] = None,
+    ):
+        """
+        Args:
+            enable_profiling: Include the benchmark task (defaults to ENABLE_PROFILING)
+            backend_model: Model for the backend engineer (defaults to agents.yaml)
+            run_id: Run the agents' code executions belong to, for the execution scheduler
+            lane: Lane of the run the team works in, e.g. one best-of-N candidate. Its code
+                executions get their own per-run cap and its calls are traced apart
+        """
+        self.enable_profiling = ENABLE_PROFILING if enable_profiling is None else enable_profiling
+        self.backend_model = backend_model
+        self.run_id = run_id
+        self.lane = lane
+
     @agent
     def engineering_lead(self) -> Agent:
         """Engineering Lead agent that creates detailed designs."""
         return Agent(
             config=self.agents_config["engineering_lead"],
-            verbose=True,
+            llm=build_llm(self.agents_config["engineering_lead"]["llm"], self.lane),
+            verbose=VERBOSE,
         )
 
     @agent
@@ -33,16 +96,19 @@ class EngineeringTeam:
         """Backend Engineer agent that implements the design."""
         agent_config = {
             "config": self.agents_config["backend_engineer"],
-            "verbose": True,
+            "llm": build_llm(
+                self.backend_model or self.agents_config["backend_engineer"]["llm"], self.lane
+            ),
+            "verbose": VERBOSE,
         }
         # Only enable code execution if explicitly enabled
         # Note: Code execution may not work on Docker Desktop (macOS) due to path mounting restrictions
         if ENABLE_CODE_EXECUTION:
             agent_config.update({
-                "allow_code_execution": True,
-                "code_execution_mode": "safe",  # Uses Docker for safety
-                "max_execution_time": 500,
-                "max_retry_limit": 3,
+                # Runs in Docker
+                "tools": [BoundedCodeInterpreterTool(run_id=self.run_id, lane=self.lane)],
+                "max_execution_time": MAX_EXECUTION_TIME,
+                "max_retry_limit": MAX_RETRY_LIMIT,
             })
         return Agent(**agent_config)
 
@@ -51,7 +117,8 @@ class EngineeringTeam:
         """Frontend Engineer agent that creates Gradio UI."""
         return Agent(
             config=self.agents_config["frontend_engineer"],
-            verbose=True,
+            llm=build_llm(self.agents_config["frontend_engineer"]["llm"], self.lane),
+            verbose=VERBOSE,
         )
 
     @agent
@@ -59,18 +126,28 @@ class EngineeringTeam:
         """Test Engineer agent that writes unit tests."""
         agent_config = {
             "config": self.agents_config["test_engineer"],
-            "verbose": True,
+            "llm": build_llm(self.agents_config["test_engineer"]["llm"], self.lane),
+            "verbose": VERBOSE,
         }
         # Only enable code execution if explicitly enabled
         if ENABLE_CODE_EXECUTION:
             agent_config.update({
-                "allow_code_execution": True,
-                "code_execution_mode": "safe",  # Uses Docker for safety
-                "max_execution_time": 500,
-                "max_retry_limit": 3,
+                # Runs in Docker
+                "tools": [BoundedCodeInterpreterTool(run_id=self.run_id, lane=self.lane)],
+                "max_execution_time": MAX_EXECUTION_TIME,
+                "max_retry_limit": MAX_RETRY_LIMIT,
             })
         return Agent(**agent_config)
 
+    @agent
+    def performance_engineer(self) -> Agent:
+        """Performance Engineer agent that writes micro-benchmarks."""
+        return Agent(
+            config=self.agents_config["performance_engineer"],
+            llm=build_llm(self.agents_config["performance_engineer"]["llm"], self.lane),
+            verbose=VERBOSE,
+        )
+
     @task
     def design_task(self) -> Task:
         """Task for creating the design document."""
@@ -91,12 +168,84 @@ class EngineeringTeam:
         """Task for writing unit tests."""
         return Task(config=self.tasks_config["test_task"])
 
+    @task
+    def benchmark_task(self) -> Task:
+        """Task for writing the benchmark harness used by the profiling stage."""
+        return Task(config=self.tasks_config["benchmark_task"])
+
+    def spec_test_task(self) -> Task:
+        """Task for writing unit tests from the design, used to score candidates."""
+        return Task(config=self.tasks_config["spec_test_task"])
+
+    def spec_benchmark_task(self) -> Task:
+        """Task for writing a benchmark harness from the design, used to score candidates."""
+        return Task(config=self.tasks_config["spec_benchmark_task"])
+
+    def optimize_task(self) -> Task:
+        """Task for rewriting the backend code to meet the performance budget."""
+        return Task(config=self.tasks_config["optimize_task"])
+
     @crew
     def crew(self) -> Crew:
         """Creates the engineering team crew."""
+        tasks = self.tasks
+        agents = self.agents
+        if not self.enable_profiling:
+            tasks = [t for t in tasks if t is not self.benchmark_task()]
+            agents = [a for a in agents if a is not self.performance_engineer()]
+        return Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=VERBOSE,
+        )
+
+    def design_crew(self) -> Crew:
+        """Creates a crew that only produces the design, for best-of-N generation."""
+        return Crew(
+            agents=[self.engineering_lead()],
+            tasks=[self.design_task()],
+            process=Process.sequential,
+            verbose=VERBOSE,
+        )
+
+    def candidate_crew(self) -> Crew:
+        """Creates a crew that implements one candidate module from an existing design."""
+        return Crew(
+            agents=[self.backend_engineer()],
+            tasks=[self.code_task()],
+            process=Process.sequential,
+            verbose=VERBOSE,
+        )
+
+    def spec_crew(self) -> Crew:
+        """Creates a crew that writes tests and a benchmark harness from the design."""
+        return Crew(
+            agents=[self.test_engineer(), self.performance_engineer()],
+            tasks=[self.spec_test_task(), self.spec_benchmark_task()],
+            process=Process.sequential,
+            verbose=VERBOSE,
+        )
+
+    def delivery_crew(self) -> Crew:
+        """Creates a crew that builds the UI and tests for an already selected module."""
+        tasks = [self.frontend_task(), self.test_task()]
+        agents = [self.frontend_engineer(), self.test_engineer()]
+        if self.enable_profiling:
+            tasks.append(self.benchmark_task())
+            agents.append(self.performance_engineer())
+        return Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=VERBOSE,
+        )
+
+    def optimize_crew(self) -> Crew:
+        """Creates a crew that sends a profiling report back to the backend engineer."""
         return Crew(
-            agents=self.agents,
-            tasks=self.tasks,
+            agents=[self.backend_engineer()],
+            tasks=[self.optimize_task()],
             process=Process.sequential,
-            verbose=True,
+            verbose=VERBOSE,
         )
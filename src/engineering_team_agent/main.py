@@ -1,12 +1,17 @@
 """Main entry point for the Engineering Team Agent."""
 
 import os
+import shutil
 import sys
+import uuid
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+from engineering_team_agent import crew, profiling, selection, tracing
 from engineering_team_agent.crew import EngineeringTeam
+from engineering_team_agent.scheduler import lane_id, scheduler
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -16,6 +21,14 @@ def run(
     module_name: str = "accounts.py",
     class_name: str = "Account",
     output_dir: Optional[str] = None,
+    profile: Optional[bool] = None,
+    max_exponent: float = profiling.DEFAULT_MAX_EXPONENT,
+    max_seconds: float = profiling.DEFAULT_MAX_SECONDS,
+    max_optimization_rounds: int = 2,
+    method_exponents: Optional[dict[str, float]] = None,
+    candidates: int = 1,
+    candidate_models: Optional[list[str]] = None,
+    trace_path: Optional[str] = None,
 ) -> dict:
     """
     Run the engineering team crew to build, test, and create UI for a software module.
@@ -25,13 +38,48 @@ def run(
         module_name: Name of the Python module to create (e.g., "accounts.py")
         class_name: Name of the main class in the module
         output_dir: Directory to save output files (defaults to ./output)
+        profile: Benchmark the generated module and send budget violations back to the
+            backend engineer (defaults to ENABLE_PROFILING)
+        max_exponent: Largest acceptable fitted complexity exponent per public method
+        max_seconds: Largest acceptable time per call at the largest benchmark size
+        max_optimization_rounds: How many times the backend engineer may revise the module
+        method_exponents: Per-method complexity budgets, overriding the budgets declared by
+            the benchmark harness and ``max_exponent``
+        candidates: Number of backend implementations to generate in parallel; the best
+            scored one goes on to the frontend and test engineers
+        candidate_models: Backend models to spread the candidates across (round-robin)
+        trace_path: Record every LLM and tool call of the run to this trace file, for
+            offline replay with ``tracing.replay``
 
     Returns:
         Dictionary with execution results
     """
+    if profile is None:
+        profile = crew.ENABLE_PROFILING
+
+    if trace_path is not None:
+        run_arguments = {
+            "requirements": requirements,
+            "module_name": module_name,
+            "class_name": class_name,
+            "profile": profile,
+            "max_exponent": max_exponent,
+            "max_seconds": max_seconds,
+            "max_optimization_rounds": max_optimization_rounds,
+            "method_exponents": method_exponents,
+            "candidates": candidates,
+            "candidate_models": candidate_models,
+        }
+        header = {"run": run_arguments, "enable_code_execution": crew.ENABLE_CODE_EXECUTION}
+        with tracing.TraceRecorder(trace_path, header) as recorder:
+            response = run(**run_arguments, output_dir=output_dir)
+            recorder.success = response["success"]
+        response["trace_path"] = str(trace_path)
+        return response
+
     # Create output directory if it doesn't exist
     if output_dir is None:
-        output_dir = Path(__file__).parent.parent.parent.parent / "output"
+        output_dir = Path(__file__).parent.parent.parent / "output"
     else:
         output_dir = Path(output_dir)
 
@@ -42,24 +90,276 @@ def run(
         "requirements": requirements,
         "module_name": module_name,
         "class_name": class_name,
+        "output_dir": str(output_dir),
     }
+    # Identifies this run to the execution scheduler for per-run caps and queue statistics
+    run_id = uuid.uuid4().hex
 
     try:
-        # Create and run the crew
-        crew_instance = EngineeringTeam()
-        result = crew_instance.crew().kickoff(inputs=inputs)
+        if candidates > 1 or candidate_models:
+            crew_instance, results, chosen = run_best_of_n(
+                inputs, output_dir, candidates, candidate_models, profile, run_id=run_id
+            )
+        else:
+            # Create and run the crew
+            crew_instance = EngineeringTeam(enable_profiling=profile, run_id=run_id)
+            results = [crew_instance.crew().kickoff(inputs=inputs)]
+            chosen = None
 
-        return {
+        response = {
             "success": True,
-            "result": result,
+            "result": results[-1],
             "output_dir": str(output_dir),
         }
+        if chosen is not None:
+            response["selection"] = chosen
+        if profile:
+            response["performance"] = enforce_performance_budget(
+                crew_instance,
+                inputs,
+                output_dir,
+                max_exponent=max_exponent,
+                max_seconds=max_seconds,
+                max_optimization_rounds=max_optimization_rounds,
+                method_exponents=method_exponents,
+                run_id=run_id,
+                results=results,
+            )
+        response["metrics"] = usage_metrics(*results)
+        response["metrics"]["execution"] = scheduler.stats(run_id)
+        return response
     except Exception as e:
         return {
             "success": False,
             "error": str(e),
             "output_dir": str(output_dir),
         }
+    finally:
+        scheduler.finish_run(run_id)
+
+
+def run_best_of_n(
+    inputs: dict,
+    output_dir: Path,
+    candidates: int = 2,
+    candidate_models: Optional[list[str]] = None,
+    profile: bool = False,
+    run_id: Optional[str] = None,
+) -> tuple:
+    """
+    Generate several backend implementations concurrently and deliver only the best.
+
+    The design is produced once. The test and performance engineers write tests and a
+    benchmark harness from the design into ``output_dir/candidates/spec/`` while each
+    candidate is implemented by its own backend engineer into ``output_dir/candidates/<n>/``.
+    Every candidate is scored locally against those (see ``selection``); the winner is
+    copied to ``output_dir`` and handed to the frontend and test engineers.
+
+    Args:
+        inputs: Inputs for the crew
+        output_dir: Directory to save output files
+        candidates: Number of candidate implementations
+        candidate_models: Backend models to spread the candidates across (round-robin)
+        profile: Include the benchmark task in the delivery crew
+        run_id: Run the candidates belong to, for the execution scheduler; each candidate
+            executes in its own lane of the run
+
+    Returns:
+        Tuple of the winning crew, the CrewOutputs of every kickoff, and the selection
+        details (``winner`` index, ``models`` and ``scores``)
+    """
+    models = list(candidate_models or [None])
+    candidates = max(candidates, len(models))
+    output_dir = Path(output_dir)
+    spec_dir = output_dir / "candidates" / "spec"
+
+    lead = EngineeringTeam(enable_profiling=profile, run_id=run_id)
+    design_result = lead.design_crew().kickoff(inputs=inputs)
+    design_output = lead.design_task().output
+
+    # Each candidate works in its own lane, so candidates do not queue behind each other
+    # for executions and their identical prompts are told apart in traces
+    lanes = [f"candidate-{index}" for index in range(candidates)]
+    teams = []
+    for index in range(candidates):
+        team = EngineeringTeam(
+            enable_profiling=profile,
+            backend_model=models[index % len(models)],
+            run_id=run_id,
+            lane=lanes[index],
+        )
+        team.design_task().output = design_output
+        teams.append(team)
+
+    def write_spec():
+        spec_dir.mkdir(parents=True, exist_ok=True)
+        # Clear files left by an earlier run so candidates are never scored against them
+        for prefix in ("test_", "bench_"):
+            (spec_dir / f"{prefix}{inputs['module_name']}").unlink(missing_ok=True)
+        try:
+            return lead.spec_crew().kickoff(inputs={**inputs, "output_dir": str(spec_dir)})
+        except Exception:
+            # Candidates are still ranked on the remaining signals
+            return None
+
+    def implement(index: int):
+        candidate_dir = output_dir / "candidates" / str(index)
+        candidate_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            result = teams[index].candidate_crew().kickoff(
+                inputs={**inputs, "output_dir": str(candidate_dir)}
+            )
+        except Exception as e:
+            return None, selection.failed_score(str(e))
+        module_file = candidate_dir / inputs["module_name"]
+        if not module_file.exists():
+            module_file.write_text(result.raw)
+        spec.result()
+        return result, selection.score_candidate(
+            module_file,
+            inputs["class_name"],
+            reference_dir=spec_dir,
+            run_id=lane_id(run_id, lanes[index]),
+        )
+
+    with ThreadPoolExecutor(max_workers=candidates + 1) as executor:
+        # The spec only needs the design, so it is written while the candidates are
+        spec = executor.submit(write_spec)
+        outcomes = list(executor.map(implement, range(candidates)))
+
+    scores = [score for _, score in outcomes]
+    winner = selection.select_best(scores)
+    if outcomes[winner][0] is None:
+        raise RuntimeError(f"All {candidates} candidate implementations failed")
+
+    shutil.copy(
+        output_dir / "candidates" / str(winner) / inputs["module_name"],
+        output_dir / inputs["module_name"],
+    )
+    crew_instance = teams[winner]
+    delivery_result = crew_instance.delivery_crew().kickoff(inputs=inputs)
+
+    kickoffs = [design_result, spec.result(), *(result for result, _ in outcomes)]
+    results = [result for result in kickoffs if result is not None] + [delivery_result]
+    chosen = {
+        "winner": winner,
+        "models": [models[index % len(models)] for index in range(candidates)],
+        "scores": scores,
+    }
+    return crew_instance, results, chosen
+
+
+def usage_metrics(*results) -> dict:
+    """
+    Summarise token usage and prompt cache efficiency across crew runs.
+
+    Args:
+        results: The CrewOutputs returned by kickoff
+
+    Returns:
+        Dictionary with token counts and ``cache_hit_rate``, the share of prompt tokens
+        served from the provider's prompt cache
+    """
+    usages = [getattr(result, "token_usage", None) for result in results]
+    metrics = {
+        key: sum(int(getattr(usage, key, 0) or 0) for usage in usages)
+        for key in (
+            "prompt_tokens",
+            "cached_prompt_tokens",
+            "completion_tokens",
+            "total_tokens",
+            "successful_requests",
+        )
+    }
+    prompt_tokens = metrics["prompt_tokens"]
+    metrics["cache_hit_rate"] = (
+        metrics["cached_prompt_tokens"] / prompt_tokens if prompt_tokens else 0.0
+    )
+    return metrics
+
+
+def enforce_performance_budget(
+    crew_instance: EngineeringTeam,
+    inputs: dict,
+    output_dir: Path,
+    max_exponent: float = profiling.DEFAULT_MAX_EXPONENT,
+    max_seconds: float = profiling.DEFAULT_MAX_SECONDS,
+    max_optimization_rounds: int = 2,
+    method_exponents: Optional[dict[str, float]] = None,
+    run_id: Optional[str] = None,
+    results: Optional[list] = None,
+) -> dict:
+    """
+    Profile the generated module and hand budget violations back to the backend engineer.
+
+    After each rewrite the generated ``test_{module_name}`` is run again; a rewrite that
+    passes fewer tests than the module it replaced is discarded and the previous module
+    restored, so a faster but broken module is never delivered.
+
+    Args:
+        crew_instance: The crew that generated the module and its benchmark harness
+        inputs: Inputs the crew was kicked off with
+        output_dir: Directory holding the generated files
+        max_exponent: Largest acceptable fitted complexity exponent per public method
+        max_seconds: Largest acceptable time per call at the largest benchmark size
+        max_optimization_rounds: How many times the backend engineer may revise the module
+        method_exponents: Per-method complexity budgets (see ``profiling.check_budget``)
+        run_id: Run the benchmarks belong to, for the execution scheduler
+        results: List the CrewOutput of every optimization kickoff is appended to, so its
+            token usage can be included in the run's metrics
+
+    Returns:
+        The final profiling result, with the number of optimization ``rounds`` used and
+        how many rewrites were ``reverted`` for failing tests
+    """
+    module_file = Path(output_dir) / inputs["module_name"]
+    test_file = Path(output_dir) / f"test_{inputs['module_name']}"
+    pass_rate = None
+    rounds = reverted = 0
+    while True:
+        performance = profiling.profile_module(
+            output_dir,
+            inputs["module_name"],
+            max_exponent=max_exponent,
+            max_seconds=max_seconds,
+            run_id=run_id,
+            method_exponents=method_exponents,
+        )
+        performance["rounds"] = rounds
+        performance["reverted"] = reverted
+        if performance["within_budget"] or rounds >= max_optimization_rounds:
+            return performance
+        measurements = performance["measurements"]
+        if not module_file.exists() or not measurements:
+            # Nothing the backend engineer can act on
+            return performance
+        if set(measurements) == {"harness"} and "error" in measurements["harness"]:
+            # The harness itself failed to run; rewriting the module will not fix it
+            return performance
+
+        if pass_rate is None and test_file.exists():
+            pass_rate = selection.run_tests(output_dir, test_file, run_id=run_id)
+
+        rounds += 1
+        previous_code = module_file.read_text()
+        result = crew_instance.optimize_crew().kickoff(
+            inputs={
+                **inputs,
+                "code": previous_code,
+                "profile_report": performance["report"],
+            }
+        )
+        if results is not None:
+            results.append(result)
+
+        if pass_rate is not None:
+            # The frontend and tests were written against the previous module
+            new_pass_rate = selection.run_tests(output_dir, test_file, run_id=run_id)
+            if new_pass_rate < pass_rate:
+                module_file.write_text(previous_code)
+                reverted += 1
+            else:
+                pass_rate = new_pass_rate
 
 
 if __name__ == "__main__":
@@ -83,6 +383,7 @@ if __name__ == "__main__":
     result = run(requirements, module_name, class_name)
     if result["success"]:
         print(f"✅ Success! Output saved to {result['output_dir']}")
+        print(f"Prompt cache hit rate: {result['metrics']['cache_hit_rate']:.1%}")
     else:
         print(f"❌ Error: {result['error']}")
         sys.exit(1)
@@ -0,0 +1,321 @@
+"""Performance profiling stage for generated modules.
+
+The performance engineer writes a benchmark harness ``bench_{module_name}`` next to the
+generated module. The harness must define ``workloads()``, returning a mapping of method
+name to a ``setup(n)`` callable that builds an instance whose state has size ``n`` and
+returns a zero-argument callable exercising that method once. It may also define
+``budgets()``, returning a mapping of method name to the largest acceptable complexity
+exponent for that method; methods it does not list get ``max_exponent``.
+
+This module runs the harness locally in a subprocess at increasing sizes, measuring wall
+time, peak memory (tracemalloc) and a cProfile breakdown, then fits a power-law
+complexity curve ``time ~ n ** k`` for each workload and checks it against a budget.
+"""
+
+import argparse
+import contextlib
+import cProfile
+import importlib.util
+import io
+import json
+import math
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+DEFAULT_SIZES = (100, 200, 400, 800, 1600)
+# Methods whose output grows with the state (e.g. listing every transaction) are linear at
+# best; query methods (balances, holdings, totals) should be declared at QUERY_MAX_EXPONENT
+# by the harness's budgets() so a rescan of the full history is flagged
+DEFAULT_MAX_EXPONENT = 1.3
+QUERY_MAX_EXPONENT = 0.5
+DEFAULT_MAX_SECONDS = 0.01
+DEFAULT_TIMEOUT = 300
+# Most calls timed per batch; each needs its own instance, so this bounds setup cost
+MAX_BATCH = 100
+
+
+def load_module(path: Path, name: Optional[str] = None):
+    """Import a Python file by path, making its directory importable for siblings."""
+    path = Path(path)
+    directory = str(path.parent.resolve())
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(name or path.stem, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load module from {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _time_call(setup: Callable[[int], Callable[[], object]], n: int, repeat: int = 5) -> float:
+    """
+    Return the best-of-``repeat`` wall time in seconds for a single call at size ``n``.
+
+    Every call gets a fresh ``setup(n)`` built outside the timed region, so methods that
+    mutate the instance (e.g. appending a transaction) are always measured at size ``n``.
+    """
+    number = 1
+    # Scale the batch so very fast calls are not lost in timer resolution
+    while True:
+        elapsed = _time_batch(setup, n, number)
+        if elapsed >= 0.001 or number >= MAX_BATCH:
+            break
+        number *= 10
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        best = min(best, _time_batch(setup, n, number) / number)
+    return best
+
+
+def _time_batch(setup: Callable[[int], Callable[[], object]], n: int, number: int) -> float:
+    """Return the wall time of ``number`` calls, each on its own fresh instance."""
+    calls = [setup(n) for _ in range(number)]
+    start = time.perf_counter()
+    for fn in calls:
+        fn()
+    return time.perf_counter() - start
+
+
+def _peak_memory(fn: Callable[[], object]) -> int:
+    """Return the peak bytes allocated by a single call."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _profile_call(fn: Callable[[], object], limit: int = 15) -> str:
+    """Return the cumulative cProfile listing for a single call."""
+    profiler = cProfile.Profile()
+    profiler.runcall(fn)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def fit_complexity(sizes: list[int], seconds: list[float]) -> float:
+    """
+    Fit ``seconds ~ c * size ** k`` by least squares in log-log space.
+
+    Args:
+        sizes: Input sizes
+        seconds: Measured time per call at each size
+
+    Returns:
+        The exponent ``k`` (0 for constant time, 1 for linear, 2 for quadratic, ...)
+    """
+    points = [(math.log(n), math.log(t)) for n, t in zip(sizes, seconds) if n > 0 and t > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return cov / var_x
+
+
+def measure_workloads(
+    workloads: dict[str, Callable[[int], Callable[[], object]]],
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+) -> dict:
+    """
+    Benchmark each workload at increasing sizes.
+
+    Args:
+        workloads: Mapping of method name to a ``setup(n)`` callable
+        sizes: Input sizes to benchmark at
+
+    Returns:
+        Dictionary mapping workload name to its measurements, or to an ``error``
+    """
+    results = {}
+    for name, setup in workloads.items():
+        try:
+            seconds, peaks = [], []
+            for n in sizes:
+                seconds.append(_time_call(setup, n))
+                peaks.append(_peak_memory(setup(n)))
+            results[name] = {
+                "sizes": list(sizes),
+                "seconds": seconds,
+                "peak_bytes": peaks,
+                "exponent": fit_complexity(list(sizes), seconds),
+                "profile": _profile_call(setup(sizes[-1])),
+            }
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def check_budget(
+    measurements: dict,
+    max_exponent: float = DEFAULT_MAX_EXPONENT,
+    max_seconds: float = DEFAULT_MAX_SECONDS,
+    method_exponents: Optional[dict[str, float]] = None,
+) -> list[str]:
+    """
+    Return a description of every workload that breaks the performance budget.
+
+    Args:
+        measurements: Output of ``measure_workloads``
+        max_exponent: Largest acceptable fitted complexity exponent
+        max_seconds: Largest acceptable time per call at the largest size
+        method_exponents: Per-method exponent budgets, overriding both the budget the
+            harness declared for a method and ``max_exponent``
+    """
+    method_exponents = method_exponents or {}
+    violations = []
+    for name, data in measurements.items():
+        if "error" in data:
+            violations.append(f"{name}: benchmark failed ({data['error']})")
+            continue
+        budget = method_exponents.get(name, data.get("max_exponent", max_exponent))
+        if data["exponent"] > budget:
+            violations.append(
+                f"{name}: scales as O(n^{data['exponent']:.2f}), budget is O(n^{budget})"
+            )
+        if data["seconds"][-1] > max_seconds:
+            violations.append(
+                f"{name}: {data['seconds'][-1] * 1000:.3f} ms per call at n={data['sizes'][-1]}, "
+                f"budget is {max_seconds * 1000:.3f} ms"
+            )
+    return violations
+
+
+def format_report(measurements: dict, violations: list[str]) -> str:
+    """Render measurements as a plain-text report suitable for an agent prompt."""
+    lines = ["Performance report", ""]
+    for name, data in measurements.items():
+        if "error" in data:
+            lines.append(f"- {name}: ERROR {data['error']}")
+            continue
+        timings = ", ".join(
+            f"n={n}: {t * 1e6:.1f}us/{p / 1024:.1f}KiB"
+            for n, t, p in zip(data["sizes"], data["seconds"], data["peak_bytes"])
+        )
+        lines.append(f"- {name}: O(n^{data['exponent']:.2f}) [{timings}]")
+    lines.append("")
+    if violations:
+        lines.append("Budget violations:")
+        lines.extend(f"- {v}" for v in violations)
+        for name, data in measurements.items():
+            if "profile" in data and any(v.startswith(f"{name}:") for v in violations):
+                title = f"cProfile for {name} at n={data['sizes'][-1]}:"
+                lines.extend(["", title, data["profile"]])
+    else:
+        lines.append("All workloads are within budget.")
+    return "\n".join(lines)
+
+
+def profile_module(
+    output_dir: Path,
+    module_name: str,
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    max_exponent: float = DEFAULT_MAX_EXPONENT,
+    max_seconds: float = DEFAULT_MAX_SECONDS,
+    timeout: int = DEFAULT_TIMEOUT,
+    run_id: Optional[str] = None,
+    method_exponents: Optional[dict[str, float]] = None,
+) -> dict:
+    """
+    Run the generated benchmark harness for a module in a subprocess.
+
+    Args:
+        output_dir: Directory holding the generated module and ``bench_{module_name}``
+        module_name: Name of the generated module (e.g., "accounts.py")
+        sizes: Input sizes to benchmark at
+        max_exponent: Largest acceptable fitted complexity exponent
+        max_seconds: Largest acceptable time per call at the largest size
+        timeout: Seconds before the benchmark subprocess is killed
+        run_id: Run the benchmark belongs to, for the execution scheduler
+        method_exponents: Per-method exponent budgets (see ``check_budget``)
+
+    Returns:
+        Dictionary with ``within_budget``, ``measurements``, ``violations`` and ``report``
+    """
+    # Absolute paths: the subprocess runs with output_dir as its working directory
+    output_dir = Path(output_dir).resolve()
+    bench_file = output_dir / f"bench_{module_name}"
+    if not bench_file.exists():
+        violations = [f"benchmark harness {bench_file.name} was not generated"]
+        return {
+            "within_budget": False,
+            "measurements": {},
+            "violations": violations,
+            "report": format_report({}, violations),
+        }
+
+    command = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        str(bench_file),
+        "--sizes",
+        *(str(n) for n in sizes),
+    ]
+    try:
+        # Imported here: the scheduler is only needed by the parent process
+        from engineering_team_agent.scheduler import scheduler
+
+        completed = scheduler.run(
+            command,
+            run_id=run_id,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=str(output_dir),
+        )
+        if completed.returncode < 0:
+            raise RuntimeError(
+                f"benchmark process killed by signal {-completed.returncode} "
+                "(CPU or memory limit exceeded?)"
+            )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip() or "benchmark process failed")
+        measurements = json.loads(completed.stdout)
+    except subprocess.TimeoutExpired:
+        measurements = {"harness": {"error": f"timed out after {timeout}s"}}
+    except (RuntimeError, json.JSONDecodeError) as e:
+        measurements = {"harness": {"error": str(e)}}
+
+    violations = check_budget(measurements, max_exponent, max_seconds, method_exponents)
+    return {
+        "within_budget": not violations,
+        "measurements": measurements,
+        "violations": violations,
+        "report": format_report(measurements, violations),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Benchmark a harness file and print the measurements as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("bench_file", type=Path)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the JSON result even if the harness prints
+    with contextlib.redirect_stdout(sys.stderr):
+        bench = load_module(args.bench_file)
+        measurements = measure_workloads(bench.workloads(), tuple(args.sizes))
+        budgets = bench.budgets() if hasattr(bench, "budgets") else {}
+    for name, budget in budgets.items():
+        if name in measurements:
+            measurements[name]["max_exponent"] = float(budget)
+    print(json.dumps(measurements))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
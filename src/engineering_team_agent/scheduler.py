@@ -0,0 +1,204 @@
+"""Resource-bounded execution of generated code.
+
+Every execution of generated code (benchmark harnesses, candidate import checks, test runs
+and the agents' own code interpreter calls) goes through an ``ExecutionScheduler``. It
+caps how many executions overlap globally and per run, queueing instead of
+oversubscribing the host. Local executions run in a subprocess with address-space and
+CPU-time rlimits, and agent code in a container with the same limits (see
+``tools.code_interpreter``), so a runaway module cannot pin a CPU or exhaust memory.
+Queue wait times are recorded so callers can report them.
+
+A run can split its executions into lanes with ``lane_id``, one per best-of-N candidate
+for example, so candidates do not queue behind each other: each lane gets its own per-run
+cap, the global cap still applies, and statistics are reported under the run.
+
+Limits are read from the environment:
+
+- ``MAX_CONCURRENT_EXECUTIONS``: executions running at once across all runs (default 2)
+- ``MAX_EXECUTIONS_PER_RUN``: executions running at once within one run (default 1)
+- ``EXECUTION_MEMORY_LIMIT_MB``: address-space limit per execution (default 1024)
+- ``EXECUTION_CPU_SECONDS``: CPU-time limit per execution (default 120)
+- ``EXECUTION_CPUS``: CPU cores available to each containerised execution (default 1)
+- ``EXECUTION_WALL_SECONDS``: wall-clock limit per containerised execution (default 300)
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+# Applies rlimits and then execs the real command. Used instead of preexec_fn, which is
+# not safe to use from the worker threads that run executions.
+_RLIMIT_TRAMPOLINE = (
+    "import os, resource, sys\n"
+    "memory, cpu = int(sys.argv[1]), int(sys.argv[2])\n"
+    "if memory: resource.setrlimit(resource.RLIMIT_AS, (memory, memory))\n"
+    "if cpu: resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))\n"
+    "os.execvp(sys.argv[3], sys.argv[3:])\n"
+)
+
+
+def limit_command(
+    command: list[str], memory_limit_mb: Optional[int], cpu_seconds: Optional[int]
+) -> list[str]:
+    """Wrap a command so it runs under address-space and CPU-time rlimits."""
+    if resource is None or (not memory_limit_mb and not cpu_seconds):
+        return list(command)
+    memory = (memory_limit_mb or 0) * 1024 * 1024
+    return [
+        sys.executable,
+        "-c",
+        _RLIMIT_TRAMPOLINE,
+        str(memory),
+        str(cpu_seconds or 0),
+        *command,
+    ]
+
+
+# Separates the run from the lane in an execution id; run ids never contain it
+LANE_SEPARATOR = "/"
+
+
+def lane_id(run_id: Optional[str], lane: str) -> Optional[str]:
+    """Return the execution id for one lane of a run, capped separately from the run."""
+    return f"{run_id}{LANE_SEPARATOR}{lane}" if run_id else None
+
+
+def _run_of(run_id: Optional[str]) -> Optional[str]:
+    return run_id.split(LANE_SEPARATOR, 1)[0] if run_id else run_id
+
+
+def _empty_stats() -> dict:
+    return {"executions": 0, "queue_seconds_total": 0.0, "queue_seconds_max": 0.0}
+
+
+class ExecutionScheduler:
+    """Admits code executions under global and per-run concurrency caps."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_per_run: int = 1,
+        memory_limit_mb: Optional[int] = 1024,
+        cpu_seconds: Optional[int] = 120,
+        cpus: Optional[float] = 1.0,
+        wall_seconds: Optional[int] = 300,
+    ):
+        """
+        Args:
+            max_concurrent: Executions running at once across all runs
+            max_per_run: Executions running at once within one run
+            memory_limit_mb: Address-space limit per execution (None for no limit)
+            cpu_seconds: CPU-time limit per execution (None for no limit)
+            cpus: CPU cores per containerised execution (None for no limit)
+            wall_seconds: Wall-clock limit per containerised execution (None for no limit)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_per_run = max_per_run
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_seconds = cpu_seconds
+        self.cpus = cpus
+        self.wall_seconds = wall_seconds
+        self._global = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._per_run: dict[str, threading.BoundedSemaphore] = {}
+        self._stats: dict[Optional[str], dict] = {}
+        self.queued = 0
+        self.running = 0
+
+    @classmethod
+    def from_env(cls) -> "ExecutionScheduler":
+        """Create a scheduler configured from environment variables."""
+        return cls(
+            max_concurrent=int(os.getenv("MAX_CONCURRENT_EXECUTIONS", "2")),
+            max_per_run=int(os.getenv("MAX_EXECUTIONS_PER_RUN", "1")),
+            memory_limit_mb=int(os.getenv("EXECUTION_MEMORY_LIMIT_MB", "1024")) or None,
+            cpu_seconds=int(os.getenv("EXECUTION_CPU_SECONDS", "120")) or None,
+            cpus=float(os.getenv("EXECUTION_CPUS", "1")) or None,
+            wall_seconds=int(os.getenv("EXECUTION_WALL_SECONDS", "300")) or None,
+        )
+
+    def _run_semaphore(self, run_id: Optional[str]) -> Optional[threading.BoundedSemaphore]:
+        if run_id is None:
+            return None
+        with self._lock:
+            if run_id not in self._per_run:
+                self._per_run[run_id] = threading.BoundedSemaphore(self.max_per_run)
+            return self._per_run[run_id]
+
+    def _record_wait(self, run_id: Optional[str], waited: float):
+        with self._lock:
+            stats = self._stats.setdefault(_run_of(run_id), _empty_stats())
+            stats["executions"] += 1
+            stats["queue_seconds_total"] += waited
+            stats["queue_seconds_max"] = max(stats["queue_seconds_max"], waited)
+
+    @contextmanager
+    def slot(self, run_id: Optional[str] = None):
+        """Block until an execution slot is free for ``run_id`` (or lane), then hold it."""
+        run_semaphore = self._run_semaphore(run_id)
+        queued_at = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+        # Take the per-run slot first so one run cannot hold several global slots idle
+        if run_semaphore is not None:
+            run_semaphore.acquire()
+        self._global.acquire()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        self._record_wait(run_id, time.perf_counter() - queued_at)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._global.release()
+            if run_semaphore is not None:
+                run_semaphore.release()
+
+    def run(
+        self, command: list[str], run_id: Optional[str] = None, **kwargs
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a command under the scheduler's concurrency caps and resource limits.
+
+        Args:
+            command: Command to execute
+            run_id: Run or lane (see ``lane_id``) the execution belongs to, for the
+                per-run cap and statistics
+            **kwargs: Passed through to subprocess.run
+
+        Raises:
+            subprocess.TimeoutExpired: If ``timeout`` is given and exceeded
+        """
+        with self.slot(run_id):
+            return subprocess.run(
+                limit_command(command, self.memory_limit_mb, self.cpu_seconds), **kwargs
+            )
+
+    def stats(self, run_id: Optional[str] = None) -> dict:
+        """Return execution count and queue wait times for a run."""
+        with self._lock:
+            return dict(self._stats.get(run_id) or _empty_stats())
+
+    def finish_run(self, run_id: str) -> dict:
+        """Forget a finished run and its lanes, and return its final statistics."""
+        stats = self.stats(run_id)
+        with self._lock:
+            for key in [key for key in self._per_run if _run_of(key) == run_id]:
+                del self._per_run[key]
+            self._stats.pop(run_id, None)
+        return stats
+
+
+scheduler = ExecutionScheduler.from_env()
@@ -0,0 +1,215 @@
+"""Local scoring of candidate modules for best-of-N generation.
+
+Each candidate implementation of ``code_task`` is scored without any LLM calls:
+
+1. the source must parse,
+2. the module must import and define the requested class,
+3. tests and a benchmark harness written from the design for this run are run against
+   the candidate; the benchmark checks the performance budget and measures its runtime,
+4. ruff lint findings are counted when ruff is installed.
+
+Candidates are ranked on those signals in that order and the best one wins.
+"""
+
+import ast
+import json
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Optional
+
+from engineering_team_agent import profiling
+from engineering_team_agent.scheduler import scheduler
+
+DEFAULT_TIMEOUT = 120
+BENCHMARK_SIZES = (50, 100, 200, 400)
+
+_IMPORT_CHECK = (
+    "import sys; sys.path.insert(0, '.'); import importlib; "
+    "module = importlib.import_module(sys.argv[1]); getattr(module, sys.argv[2])"
+)
+
+
+def _check_import(
+    candidate_dir: Path, module_name: str, class_name: str, timeout: int, run_id: Optional[str]
+) -> bool:
+    """Import the candidate in a subprocess and check the class exists."""
+    try:
+        completed = scheduler.run(
+            [sys.executable, "-c", _IMPORT_CHECK, Path(module_name).stem, class_name],
+            run_id=run_id,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=str(candidate_dir),
+        )
+    except subprocess.TimeoutExpired:
+        return False
+    return completed.returncode == 0
+
+
+def _count_lint_issues(module_file: Path, timeout: int) -> Optional[int]:
+    """Return the number of ruff findings, or None when ruff is unavailable."""
+    ruff = shutil.which("ruff")
+    if ruff is None:
+        return None
+    try:
+        completed = subprocess.run(
+            [ruff, "check", "--output-format=json", "--isolated", str(module_file)],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        return len(json.loads(completed.stdout or "[]"))
+    except (subprocess.TimeoutExpired, json.JSONDecodeError):
+        return None
+
+
+def run_tests(
+    candidate_dir: Path,
+    test_file: Path,
+    timeout: int = DEFAULT_TIMEOUT,
+    run_id: Optional[str] = None,
+) -> float:
+    """Run a test module against the module in ``candidate_dir`` and return the pass rate."""
+    candidate_dir, test_file = Path(candidate_dir), Path(test_file)
+    if test_file.parent.resolve() != candidate_dir.resolve():
+        shutil.copy(test_file, candidate_dir / test_file.name)
+    report = candidate_dir / "junit.xml"
+    try:
+        scheduler.run(
+            [
+                sys.executable,
+                "-m",
+                "pytest",
+                "-q",
+                "-p",
+                "no:cacheprovider",
+                "-o",
+                "addopts=",
+                "--rootdir",
+                str(candidate_dir),
+                f"--junitxml={report}",
+                test_file.name,
+            ],
+            run_id=run_id,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=str(candidate_dir),
+        )
+        root = ET.parse(report).getroot()
+    except (subprocess.TimeoutExpired, ET.ParseError, FileNotFoundError):
+        return 0.0
+    finally:
+        report.unlink(missing_ok=True)
+    suite = root if root.tag == "testsuite" else root.find("testsuite")
+    if suite is None:
+        return 0.0
+    total = int(suite.get("tests", 0))
+    if total == 0:
+        return 0.0
+    failed = sum(int(suite.get(key, 0)) for key in ("failures", "errors"))
+    return (total - failed) / total
+
+
+def score_candidate(
+    module_file: Path,
+    class_name: str,
+    reference_dir: Optional[Path] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    run_id: Optional[str] = None,
+) -> dict:
+    """
+    Score a candidate module locally.
+
+    Args:
+        module_file: Path to the candidate module, alone in its own directory
+        class_name: Name of the class the module must define
+        reference_dir: Directory holding the test_{module_name} and bench_{module_name}
+            written for this run; each is run against the candidate when present
+        timeout: Seconds allowed for each subprocess
+        run_id: Run the candidate belongs to, for the execution scheduler
+
+    Returns:
+        Dictionary with the individual signals and a sortable ``rank`` (higher is better)
+    """
+    module_file = Path(module_file)
+    candidate_dir = module_file.parent
+    module_name = module_file.name
+    score = _empty_score()
+
+    try:
+        ast.parse(module_file.read_text())
+        score["parses"] = True
+    except (SyntaxError, ValueError, OSError):
+        score["rank"] = _rank(score)
+        return score
+
+    score["imports"] = _check_import(candidate_dir, module_name, class_name, timeout, run_id)
+    score["lint_issues"] = _count_lint_issues(module_file, timeout)
+
+    if reference_dir is not None and score["imports"]:
+        test_file = Path(reference_dir) / f"test_{module_name}"
+        if test_file.exists():
+            score["test_pass_rate"] = run_tests(candidate_dir, test_file, timeout, run_id)
+
+        bench_file = Path(reference_dir) / f"bench_{module_name}"
+        if bench_file.exists():
+            shutil.copy(bench_file, candidate_dir / bench_file.name)
+            performance = profiling.profile_module(
+                candidate_dir, module_name, sizes=BENCHMARK_SIZES, timeout=timeout, run_id=run_id
+            )
+            score["within_budget"] = performance["within_budget"]
+            seconds = [
+                data["seconds"][-1]
+                for data in performance["measurements"].values()
+                if "seconds" in data
+            ]
+            score["benchmark_seconds"] = sum(seconds) if seconds else None
+
+    score["rank"] = _rank(score)
+    return score
+
+
+def _empty_score() -> dict:
+    """Return a score with every signal unset."""
+    return {
+        "parses": False,
+        "imports": False,
+        "test_pass_rate": None,
+        "within_budget": None,
+        "benchmark_seconds": None,
+        "lint_issues": None,
+    }
+
+
+def _rank(score: dict) -> tuple:
+    """Build the sort key for a score; missing signals rank as neutral."""
+    return (
+        "error" not in score,
+        score["parses"],
+        score["imports"],
+        score["test_pass_rate"] or 0.0,
+        bool(score["within_budget"]),
+        -(score["lint_issues"] or 0),
+        -(score["benchmark_seconds"] or 0.0),
+    )
+
+
+def failed_score(error: str) -> dict:
+    """Return the score for a candidate that produced no module at all."""
+    score = _empty_score()
+    score["error"] = error
+    score["rank"] = _rank(score)
+    return score
+
+
+def select_best(scores: list[dict]) -> int:
+    """Return the index of the best scored candidate; earlier candidates win ties."""
+    if not scores:
+        raise ValueError("No candidates to select from")
+    # tuple(): ranks served from a replayed trace come back as JSON lists
+    return max(range(len(scores)), key=lambda i: (tuple(scores[i]["rank"]), -i))
@@ -0,0 +1,377 @@
+"""Headless HTTP API for the Engineering Team Agent.
+
+A dependency-free ASGI application exposing ``run()`` to other services:
+
+- ``POST /runs`` submits a run and returns its id. Identical requests that are still in
+  flight (same hashed inputs, with ``run()``'s defaults filled in) are coalesced onto the existing run instead of starting a
+  second crew execution.
+- ``GET /runs/{id}`` returns the run status and, once finished, its results.
+- ``GET /runs/{id}/stream`` streams status changes as server-sent events.
+- ``GET /runs/{id}/artifacts`` lists the generated files and
+  ``GET /runs/{id}/artifacts/{name}`` downloads one.
+- ``GET /health`` for load balancer health checks.
+
+Finished runs are forgotten after ``SERVER_JOB_TTL_SECONDS`` and beyond the newest
+``SERVER_MAX_FINISHED_JOBS``; their files stay in the output directory.
+
+Serve it with any ASGI server, e.g. ``python -m engineering_team_agent.server`` (uvicorn).
+Coalescing is per process; put identical requests on the same instance (e.g. hash-based
+routing on the load balancer) to coalesce across a horizontally scaled deployment.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from engineering_team_agent import crew
+from engineering_team_agent.main import run
+
+DEFAULT_OUTPUT_DIR = Path(__file__).parent.parent.parent / "output" / "runs"
+MAX_CONCURRENT_RUNS = int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "4"))
+JOB_TTL_SECONDS = int(os.getenv("SERVER_JOB_TTL_SECONDS", "86400"))
+MAX_FINISHED_JOBS = int(os.getenv("SERVER_MAX_FINISHED_JOBS", "1000"))
+
+# Inputs accepted by POST /runs and forwarded to run()
+RUN_OPTIONS = {
+    "requirements": str,
+    "module_name": str,
+    "class_name": str,
+    "profile": bool,
+    "candidates": int,
+    "candidate_models": list,
+}
+
+
+# run()'s defaults for those inputs, so omitted and explicitly defaulted fields coalesce
+RUN_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in inspect.signature(run).parameters.items()
+    if name in RUN_OPTIONS and parameter.default is not inspect.Parameter.empty
+}
+
+
+def with_run_defaults(inputs: dict) -> dict:
+    """Return the inputs with every option ``run()`` would default filled in."""
+    filled = {**RUN_DEFAULTS, **inputs}
+    if filled.get("profile") is None:
+        filled["profile"] = crew.ENABLE_PROFILING
+    return filled
+
+
+def request_key(inputs: dict) -> str:
+    """Hash run inputs canonically so identical requests map to the same key."""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def parse_run_request(body: bytes) -> dict:
+    """
+    Validate a POST /runs body.
+
+    Raises:
+        TypeError: If the body is not a JSON object
+        ValueError: If the body is not valid JSON or has invalid run options
+    """
+    try:
+        payload = json.loads(body or b"{}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+    if not isinstance(payload, dict):
+        raise TypeError("Request body must be a JSON object")
+
+    unknown = set(payload) - set(RUN_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    for name, value in payload.items():
+        expected = RUN_OPTIONS[name]
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"Field '{name}' must be of type {expected.__name__}")
+    if not payload.get("requirements", "").strip():
+        raise ValueError("Field 'requirements' is required")
+    return payload
+
+
+class Job:
+    """A submitted run and the history of its status changes."""
+
+    def __init__(self, key: str, inputs: dict, base_dir: Path):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.inputs = inputs
+        self.output_dir = base_dir / self.id
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.response: Optional[dict] = None
+        self.events: list[dict] = []
+        self._changed = asyncio.Event()
+        self._record()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def update(self, status: str, response: Optional[dict] = None):
+        """Move the job to a new status and wake any streams."""
+        self.status = status
+        if status == "running":
+            self.started_at = time.time()
+        if response is not None:
+            self.response = response
+            self.finished_at = time.time()
+        self._record()
+
+    def _record(self):
+        self.events.append({"status": self.status, "time": time.time()})
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, seen: int):
+        """Wait until more than ``seen`` events have been recorded."""
+        while len(self.events) <= seen:
+            await self._changed.wait()
+
+    def to_dict(self) -> dict:
+        """Serialise the job for the status endpoint."""
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_seconds": (self.started_at or time.time()) - self.created_at,
+        }
+        if self.response is not None:
+            result = self.response.get("result")
+            data.update(
+                {
+                    key: self.response[key]
+                    for key in ("error", "metrics", "selection", "performance")
+                    if key in self.response
+                }
+            )
+            if result is not None:
+                data["result"] = getattr(result, "raw", str(result))
+        return data
+
+
+class EngineeringTeamServer:
+    """ASGI application that runs the engineering team behind an HTTP API."""
+
+    def __init__(
+        self,
+        runner: Callable[..., dict] = run,
+        output_dir: Optional[Path] = None,
+        max_concurrent_runs: int = MAX_CONCURRENT_RUNS,
+        job_ttl_seconds: int = JOB_TTL_SECONDS,
+        max_finished_jobs: int = MAX_FINISHED_JOBS,
+    ):
+        """
+        Args:
+            runner: Function executing a run (``run`` by default; tests pass a fake)
+            output_dir: Base directory for per-run output directories
+            max_concurrent_runs: Crew executions allowed at once; further runs queue
+            job_ttl_seconds: How long a finished run stays queryable
+            max_finished_jobs: Finished runs kept queryable; the oldest are forgotten first
+        """
+        self.runner = runner
+        self.output_dir = Path(output_dir) if output_dir else DEFAULT_OUTPUT_DIR
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_runs)
+        self.job_ttl_seconds = job_ttl_seconds
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: dict[str, Job] = {}
+        self.in_flight: dict[str, Job] = {}
+        self._http_clients: list = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.warm_provider_clients()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def warm_provider_clients(self):
+        """
+        Share keep-alive HTTP clients across the OpenAI and Azure calls made by litellm.
+
+        litellm hands ``client_session``/``aclient_session`` to the OpenAI SDK clients
+        only; Anthropic and other providers go through litellm's own HTTP handlers and
+        are not affected.
+        """
+        try:
+            import httpx
+            import litellm
+        except ImportError:
+            return
+        limits = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=300)
+        litellm.client_session = httpx.Client(limits=limits, timeout=600)
+        litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=600)
+        self._http_clients = [litellm.client_session, litellm.aclient_session]
+
+    async def close(self):
+        """Close shared HTTP clients and stop accepting work."""
+        for client in self._http_clients:
+            if hasattr(client, "aclose"):
+                await client.aclose()
+            else:
+                client.close()
+        self._http_clients = []
+        self.executor.shutdown(wait=False)
+
+    def submit(self, inputs: dict) -> tuple[Job, bool]:
+        """
+        Start a run, or join the in-flight run with identical inputs.
+
+        Returns:
+            The job and whether it was coalesced onto an existing run
+        """
+        key = request_key(with_run_defaults(inputs))
+        if key in self.in_flight:
+            return self.in_flight[key], True
+
+        self.prune_jobs()
+        job = Job(key, inputs, self.output_dir)
+        self.jobs[job.id] = job
+        self.in_flight[key] = job
+        asyncio.get_running_loop().create_task(self._execute(job))
+        return job, False
+
+    async def _execute(self, job: Job):
+        loop = asyncio.get_running_loop()
+
+        def execute():
+            loop.call_soon_threadsafe(job.update, "running")
+            return self.runner(**job.inputs, output_dir=str(job.output_dir))
+
+        try:
+            response = await loop.run_in_executor(self.executor, execute)
+        except Exception as e:
+            response = {"success": False, "error": str(e), "output_dir": str(job.output_dir)}
+        finally:
+            self.in_flight.pop(job.key, None)
+        job.update("succeeded" if response.get("success") else "failed", response)
+        self.prune_jobs()
+
+    def prune_jobs(self):
+        """Forget finished jobs past their TTL, then the oldest beyond the retention limit."""
+        now = time.time()
+        finished = sorted(
+            (job for job in self.jobs.values() if job.done), key=lambda job: job.finished_at
+        )
+        expired = [job for job in finished if now - job.finished_at > self.job_ttl_seconds]
+        excess = finished[: max(len(finished) - self.max_finished_jobs, 0)]
+        for job in expired + excess:
+            self.jobs.pop(job.id, None)
+
+    async def _http(self, scope, receive, send):
+        method = scope["method"]
+        parts = [part for part in scope["path"].split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            return await _send_json(send, 200, {"status": "ok"})
+
+        if parts == ["runs"] and method == "POST":
+            try:
+                inputs = parse_run_request(await _read_body(receive))
+            except (TypeError, ValueError) as e:
+                return await _send_json(send, 400, {"error": str(e)})
+            job, coalesced = self.submit(inputs)
+            return await _send_json(
+                send, 202, {"id": job.id, "status": job.status, "coalesced": coalesced}
+            )
+
+        if len(parts) >= 2 and parts[0] == "runs" and method == "GET":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return await _send_json(send, 404, {"error": "Run not found"})
+            if len(parts) == 2:
+                return await _send_json(send, 200, job.to_dict())
+            if parts[2:] == ["stream"]:
+                return await self._stream(job, send)
+            if parts[2:] == ["artifacts"]:
+                return await _send_json(send, 200, {"artifacts": _list_artifacts(job)})
+            if len(parts) == 4 and parts[2] == "artifacts":
+                if parts[3] not in _list_artifacts(job):
+                    return await _send_json(send, 404, {"error": "Artifact not found"})
+                content = (job.output_dir / parts[3]).read_bytes()
+                return await _send(send, 200, content, b"text/plain; charset=utf-8")
+
+        await _send_json(send, 404, {"error": "Not found"})
+
+    async def _stream(self, job: Job, send):
+        """Stream every status change of a job as server-sent events until it finishes."""
+        headers = [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        seen = 0
+        while True:
+            for event in job.events[seen:]:
+                payload = f"event: status\ndata: {json.dumps(event)}\n\n".encode()
+                await send({"type": "http.response.body", "body": payload, "more_body": True})
+            seen = len(job.events)
+            if job.done:
+                break
+            await job.wait_for_change(seen)
+        payload = f"event: result\ndata: {json.dumps(job.to_dict())}\n\n".encode()
+        await send({"type": "http.response.body", "body": payload})
+
+
+def _list_artifacts(job: Job) -> list[str]:
+    """Return the generated files of a job (top level only)."""
+    if not job.output_dir.is_dir():
+        return []
+    return sorted(path.name for path in job.output_dir.iterdir() if path.is_file())
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send(send, status: int, body: bytes, content_type: bytes):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type)],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status: int, payload: dict):
+    await _send(send, status, json.dumps(payload).encode(), b"application/json")
+
+
+app = EngineeringTeamServer()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.getenv("SERVER_HOST", "0.0.0.0"),
+        port=int(os.getenv("SERVER_PORT", "8000")),
+    )
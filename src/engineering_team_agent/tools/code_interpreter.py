@@ -0,0 +1,116 @@
+"""Code interpreter tool for agents, bounded by the execution scheduler."""
+
+import os
+import uuid
+from typing import Optional
+
+from crewai_tools import CodeInterpreterTool
+from docker import from_env as docker_from_env
+from docker.models.containers import Container
+from docker.types import Ulimit
+
+from engineering_team_agent.scheduler import ExecutionScheduler, lane_id, scheduler
+
+
+def container_limits(limits: ExecutionScheduler) -> dict:
+    """Translate a scheduler's per-execution limits into ``docker run`` options."""
+    options = {}
+    if limits.memory_limit_mb:
+        options["mem_limit"] = f"{limits.memory_limit_mb}m"
+        # Same as mem_limit: no swap on top of the memory limit
+        options["memswap_limit"] = f"{limits.memory_limit_mb}m"
+    if limits.cpus:
+        options["nano_cpus"] = int(limits.cpus * 1e9)
+    if limits.cpu_seconds:
+        options["ulimits"] = [
+            Ulimit(name="cpu", soft=limits.cpu_seconds, hard=limits.cpu_seconds)
+        ]
+    return options
+
+
+def deadline_command(command: list[str], wall_seconds: Optional[int]) -> list[str]:
+    """Wrap a container command so coreutils ``timeout`` kills it after ``wall_seconds``."""
+    if not wall_seconds:
+        return list(command)
+    # SIGTERM at the deadline, SIGKILL shortly after if the code ignores it
+    return ["timeout", "--kill-after=5", str(wall_seconds), *command]
+
+
+# Exit code of ``timeout`` when the deadline was hit, and of a SIGKILLed process (the
+# deadline's --kill-after or the container's memory limit)
+_TIMED_OUT_EXIT_CODE = 124
+_KILLED_EXIT_CODE = 137
+
+
+class BoundedCodeInterpreterTool(CodeInterpreterTool):
+    """
+    Docker code interpreter that shares the execution scheduler with local executions.
+
+    Every call waits for a scheduler slot of its run or lane, so agent code counts against the
+    same concurrency caps and queue statistics as benchmarks and candidate scoring, and
+    its container gets the scheduler's memory, CPU and wall-clock limits. The container is
+    removed however the execution ends. Without Docker the code is not run at all,
+    rather than falling back to crewai's in-process sandbox.
+    """
+
+    run_id: Optional[str] = None
+    lane: Optional[str] = None
+
+    def _run(self, **kwargs) -> str:
+        """Run the code once an execution slot for the run (or its lane) is free."""
+        with scheduler.slot(lane_id(self.run_id, self.lane) if self.lane else self.run_id):
+            return super()._run(**kwargs)
+
+    def _init_docker_container(self) -> Container:
+        """Start a resource-limited container for a single execution."""
+        client = docker_from_env()
+        return client.containers.run(
+            self.default_image_tag,
+            detach=True,
+            tty=True,
+            working_dir="/workspace",
+            # The stock tool reuses one container name, so concurrent runs would stop
+            # each other's container
+            name=f"code-interpreter-{uuid.uuid4().hex[:12]}",
+            volumes={os.getcwd(): {"bind": "/workspace", "mode": "rw"}},
+            **container_limits(scheduler),
+        )
+
+    def _install_libraries(self, container: Container, libraries: list[str]) -> None:
+        """Install the requested libraries, each under the wall-clock limit."""
+        for library in libraries:
+            container.exec_run(
+                deadline_command(["pip", "install", library], scheduler.wall_seconds)
+            )
+
+    def run_code_in_docker(self, code: str, libraries_used: list[str]) -> str:
+        """Run the code in a fresh container under a deadline, then remove the container."""
+        self._verify_docker_image()
+        container = self._init_docker_container()
+        try:
+            self._install_libraries(container, libraries_used)
+            exec_result = container.exec_run(
+                deadline_command(["python3", "-c", code], scheduler.wall_seconds)
+            )
+        finally:
+            # The stock tool only cleans up on success, leaking containers on errors
+            container.remove(force=True)
+
+        output = exec_result.output.decode("utf-8")
+        if scheduler.wall_seconds and exec_result.exit_code == _TIMED_OUT_EXIT_CODE:
+            return (
+                f"The code did not finish within {scheduler.wall_seconds} seconds and was "
+                f"stopped:\n{output}"
+            )
+        if exec_result.exit_code == _KILLED_EXIT_CODE:
+            return f"The code was killed for exceeding its time or memory limit:\n{output}"
+        if exec_result.exit_code != 0:
+            return f"Something went wrong while running the code: \n{output}"
+        return output
+
+    def run_code_in_restricted_sandbox(self, code: str) -> str:
+        """Refuse to run code in-process, where no memory or CPU limit can apply."""
+        return (
+            "Code execution is unavailable: Docker is not running. "
+            "Review the code by reading it instead."
+        )
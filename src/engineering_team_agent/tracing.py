@@ -0,0 +1,547 @@
+"""Compact run traces and offline replay.
+
+``TraceRecorder`` captures every LLM request/response and tool call made during a run,
+with timings, into a gzip-compressed JSONL file. Message contents are stored once and
+referenced by hash, so the ever-growing conversation of each agent does not bloat the
+trace.
+
+``ReplayEngine`` serves a recorded trace back in place of the providers, tools and the
+local computations that depend on the machine (profiling and candidate scoring), so
+``EngineeringTeam`` can be re-executed offline and deterministically. Recorded runs can
+therefore be used as performance regression fixtures, and verbose console output is no
+longer needed to debug a run (set ``CREWAI_VERBOSE=false``).
+
+Trace lines are JSON objects with a ``type``:
+
+- ``header``: format version, run arguments and crew configuration
+- ``blob``: a message, stored once under its ``hash``
+- ``llm``: a completion request (``model``, ``messages`` as blob hashes, ``request_hash``)
+  with its ``response`` message, ``usage``, ``started`` offset and ``duration``
+- ``tool``: a tool call (``tool``, ``input``, ``input_hash``, ``output``) with timings
+- ``result``: the ``result`` of a local computation (``function``, ``key``) with timings,
+  i.e. ``profiling.profile_module`` and ``selection.score_candidate``
+- ``end``: whether the run succeeded and its total duration
+
+``llm`` and ``tool`` records also carry the ``lane`` that made the call (see
+``EngineeringTeam(lane=...)``), and replay matches on it: best-of-N candidates send
+identical prompts concurrently, and each must get back its own recorded response.
+
+Recording and replay patch ``litellm.completion`` and those functions process-wide, so
+record or replay one run at a time per process.
+
+Usage::
+
+    run(requirements, trace_path="traces/accounts.jsonl.gz")
+    python -m engineering_team_agent.tracing replay traces/accounts.jsonl.gz
+    python -m engineering_team_agent.tracing summary traces/accounts.jsonl.gz
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+TRACE_VERSION = 3
+
+# Replays stay offline: no telemetry and no remote model cost map
+OFFLINE_ENVIRONMENT = {
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class TraceMismatchError(RuntimeError):
+    """Raised in strict replay when a request has no recorded counterpart."""
+
+
+def _hash(value) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def request_hash(model: str, messages: list) -> str:
+    """Hash a completion request by model and messages."""
+    return _hash({"model": model, "messages": messages})
+
+
+def _to_dict(value) -> dict:
+    """Convert a litellm/pydantic object to a plain dict."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return dict(value)
+
+
+def _llm_lane(kwargs: dict) -> Optional[str]:
+    """Return the lane of a completion call, passed by ``build_llm`` as litellm metadata."""
+    return (kwargs.get("metadata") or {}).get("lane")
+
+
+def _tool_lane(tool) -> Optional[str]:
+    """Return the lane of the tool behind a ``CrewStructuredTool``, if it has one."""
+    return getattr(getattr(tool, "_original_tool", None), "lane", None)
+
+
+def _argument(args: tuple, kwargs: dict, position: int, name: str):
+    """Return a call argument given either by position or by name."""
+    return kwargs[name] if name in kwargs else args[position]
+
+
+def _patch_points():
+    """
+    Return the (owner, attribute) pairs wrapped for LLM and tool calls, and the
+    (owner, attribute, key function) triples wrapped for local results.
+    """
+    import litellm
+
+    from engineering_team_agent import profiling, selection
+
+    points = {
+        "llm": (litellm, "completion"),
+        "tool": None,
+        "results": {
+            # Optimization rounds profile the same module in order
+            "profile_module": (
+                profiling,
+                "profile_module",
+                lambda args, kwargs: str(_argument(args, kwargs, 1, "module_name")),
+            ),
+            # Candidates are scored concurrently; match them by candidate directory
+            "score_candidate": (
+                selection,
+                "score_candidate",
+                lambda args, kwargs: Path(_argument(args, kwargs, 0, "module_file")).parent.name,
+            ),
+        },
+    }
+    try:
+        from crewai.tools.structured_tool import CrewStructuredTool
+
+        points["tool"] = (CrewStructuredTool, "invoke")
+    except ImportError:
+        pass
+    return points
+
+
+class TraceRecorder:
+    """Context manager recording all LLM and tool calls to a trace file."""
+
+    def __init__(self, path, header: Optional[dict] = None):
+        """
+        Args:
+            path: Trace file to write (gzip-compressed JSONL)
+            header: Run arguments and configuration stored in the header line
+        """
+        self.path = Path(path)
+        self.header = header or {}
+        self._lock = threading.Lock()
+        self._blobs: set[str] = set()
+        self._file = None
+        self._originals = {}
+        self._local = threading.local()
+        self._start = 0.0
+        self.success: Optional[bool] = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._start = time.perf_counter()
+        self._write(
+            {"type": "header", "version": TRACE_VERSION, "created_at": time.time(), **self.header}
+        )
+        self._install()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._uninstall()
+        success = self.success if self.success is not None else exc_type is None
+        self._write(
+            {"type": "end", "success": success, "duration": time.perf_counter() - self._start}
+        )
+        self._file.close()
+        return False
+
+    def _write(self, record: dict):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def _blob(self, message) -> str:
+        message = _to_dict(message) if not isinstance(message, dict) else message
+        key = _hash(message)
+        with self._lock:
+            new = key not in self._blobs
+            self._blobs.add(key)
+        if new:
+            self._write({"type": "blob", "hash": key, "message": message})
+        return key
+
+    def _install(self):
+        points = _patch_points()
+        owner, name = points["llm"]
+        completion = getattr(owner, name)
+        self._originals["llm"] = (owner, name, completion)
+
+        def recorded_completion(*args, **kwargs):
+            started = time.perf_counter()
+            response = completion(*args, **kwargs)
+            duration = time.perf_counter() - started
+            if kwargs.get("stream"):
+                # Streamed responses are consumed by the caller; nothing to replay
+                return response
+            messages = kwargs.get("messages", [])
+            choice = response.choices[0]
+            self._write(
+                {
+                    "type": "llm",
+                    "model": kwargs.get("model"),
+                    "lane": _llm_lane(kwargs),
+                    "request_hash": request_hash(kwargs.get("model"), messages),
+                    "messages": [self._blob(m) for m in messages],
+                    "response": _to_dict(choice.message),
+                    "finish_reason": choice.finish_reason,
+                    "usage": _to_dict(response.usage) if getattr(response, "usage", None) else {},
+                    "started": started - self._start,
+                    "duration": duration,
+                }
+            )
+            return response
+
+        setattr(owner, name, recorded_completion)
+
+        if points["tool"] is not None:
+            owner, name = points["tool"]
+            invoke = getattr(owner, name)
+            self._originals["tool"] = (owner, name, invoke)
+            recorder = self
+
+            def recorded_invoke(tool, input, *args, **kwargs):
+                started = time.perf_counter()
+                output = invoke(tool, input, *args, **kwargs)
+                recorder._write(
+                    {
+                        "type": "tool",
+                        "tool": tool.name,
+                        "lane": _tool_lane(tool),
+                        "input": input,
+                        "input_hash": _hash(input),
+                        "output": output,
+                        "started": started - recorder._start,
+                        "duration": time.perf_counter() - started,
+                    }
+                )
+                return output
+
+            setattr(owner, name, recorded_invoke)
+
+        for function, (owner, name, key) in points["results"].items():
+            original = getattr(owner, name)
+            self._originals[function] = (owner, name, original)
+            setattr(owner, name, self._recorded_result(function, original, key))
+
+    def _recorded_result(self, function: str, original, key):
+        recorder = self
+
+        def recorded(*args, **kwargs):
+            if getattr(recorder._local, "busy", False):
+                # Nested in another recorded computation, which is replayed as a whole
+                return original(*args, **kwargs)
+            recorder._local.busy = True
+            started = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                recorder._local.busy = False
+            recorder._write(
+                {
+                    "type": "result",
+                    "function": function,
+                    "key": key(args, kwargs),
+                    "result": result,
+                    "started": started - recorder._start,
+                    "duration": time.perf_counter() - started,
+                }
+            )
+            return result
+
+        return recorded
+
+    def _uninstall(self):
+        for owner, name, original in self._originals.values():
+            setattr(owner, name, original)
+        self._originals = {}
+
+
+def load_trace(path) -> dict:
+    """
+    Read a trace file.
+
+    Returns:
+        Dictionary with the ``header``, ``llm``, ``tool`` and ``result`` records (in
+        recorded order), the ``blobs`` table and the ``end`` record
+    """
+    trace = {"header": {}, "blobs": {}, "llm": [], "tool": [], "result": [], "end": {}}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record.pop("type")
+            if kind == "blob":
+                trace["blobs"][record["hash"]] = record["message"]
+            elif kind in ("header", "end"):
+                trace[kind] = record
+            else:
+                trace[kind].append(record)
+    if trace["header"].get("version") != TRACE_VERSION:
+        raise ValueError(f"Unsupported trace version: {trace['header'].get('version')}")
+    return trace
+
+
+class ReplayEngine:
+    """Context manager serving recorded LLM responses, tool outputs and local results."""
+
+    def __init__(self, trace: dict, strict: bool = False, simulate_latency: bool = False):
+        """
+        Args:
+            trace: A trace loaded with ``load_trace``
+            strict: Raise TraceMismatchError when a request was not recorded, instead of
+                falling back to the next unconsumed recording for the same model or tool
+            simulate_latency: Sleep for the recorded duration of each call
+        """
+        self.strict = strict
+        self.simulate_latency = simulate_latency
+        self._lock = threading.Lock()
+        self._originals = {}
+        self._llm = self._index(trace["llm"], "request_hash", "model")
+        self._tool = self._index(trace["tool"], "input_hash", "tool")
+        self._results = self._index(trace["result"], "key", "function")
+        self.stats = {
+            "llm_calls": 0,
+            "tool_calls": 0,
+            "results": 0,
+            "mismatches": 0,
+            "recorded_seconds": 0.0,
+        }
+
+    @staticmethod
+    def _index(records: list, key: str, group: str) -> dict:
+        by_key = defaultdict(deque)
+        by_group = defaultdict(deque)
+        for record in records:
+            by_key[(record[group], record.get("lane"), record[key])].append(record)
+            by_group[record[group]].append(record)
+        return {"by_key": by_key, "by_group": by_group, "used": set()}
+
+    def _take(
+        self, index: dict, group: str, key: str, description: str, lane: Optional[str] = None
+    ) -> dict:
+        """Pop the recording for a request, falling back to recorded order within a group."""
+        with self._lock:
+            queue = index["by_key"].get((group, lane, key), deque())
+            while queue and id(queue[0]) in index["used"]:
+                queue.popleft()
+            if queue:
+                record = queue.popleft()
+            else:
+                if self.strict:
+                    where = f"{group} in lane {lane}" if lane else group
+                    raise TraceMismatchError(f"No recorded {description} for {where}")
+                self.stats["mismatches"] += 1
+                fallback = index["by_group"].get(group, deque())
+                while fallback and id(fallback[0]) in index["used"]:
+                    fallback.popleft()
+                if not fallback:
+                    raise TraceMismatchError(f"Trace exhausted: no more {description}s for {group}")
+                record = fallback.popleft()
+            index["used"].add(id(record))
+            self.stats["recorded_seconds"] += record["duration"]
+        if self.simulate_latency:
+            time.sleep(record["duration"])
+        return record
+
+    def __enter__(self):
+        import litellm
+
+        points = _patch_points()
+        owner, name = points["llm"]
+        self._originals["llm"] = (owner, name, getattr(owner, name))
+        engine = self
+
+        def replayed_completion(*args, **kwargs):
+            if kwargs.get("stream"):
+                raise TraceMismatchError("Streaming completions cannot be replayed")
+            model = kwargs.get("model")
+            record = engine._take(
+                engine._llm,
+                model,
+                request_hash(model, kwargs.get("messages", [])),
+                "completion",
+                lane=_llm_lane(kwargs),
+            )
+            with engine._lock:
+                engine.stats["llm_calls"] += 1
+            response = litellm.ModelResponse(
+                model=model,
+                choices=[{"message": record["response"], "finish_reason": record["finish_reason"]}],
+                usage=record["usage"] or None,
+            )
+            # Keep crewai's token accounting working; the real call would have run these
+            for callback in litellm.callbacks:
+                if hasattr(callback, "log_success_event"):
+                    try:
+                        callback.log_success_event(kwargs, response, None, None)
+                    except Exception:
+                        logger.warning(
+                            "litellm callback %r failed during replay", callback, exc_info=True
+                        )
+            return response
+
+        setattr(owner, name, replayed_completion)
+
+        if points["tool"] is not None:
+            owner, name = points["tool"]
+            self._originals["tool"] = (owner, name, getattr(owner, name))
+
+            def replayed_invoke(tool, input, *args, **kwargs):
+                record = engine._take(
+                    engine._tool, tool.name, _hash(input), "tool call", lane=_tool_lane(tool)
+                )
+                with engine._lock:
+                    engine.stats["tool_calls"] += 1
+                return record["output"]
+
+            setattr(owner, name, replayed_invoke)
+
+        for function, (owner, name, key) in points["results"].items():
+            self._originals[function] = (owner, name, getattr(owner, name))
+            setattr(owner, name, self._replayed_result(function, key))
+        return self
+
+    def _replayed_result(self, function: str, key):
+        engine = self
+
+        def replayed(*args, **kwargs):
+            record = engine._take(engine._results, function, key(args, kwargs), "result")
+            with engine._lock:
+                engine.stats["results"] += 1
+            return record["result"]
+
+        return replayed
+
+    def __exit__(self, exc_type, exc, tb):
+        for owner, name, original in self._originals.values():
+            setattr(owner, name, original)
+        self._originals = {}
+        return False
+
+
+@contextmanager
+def _environment_defaults(values: dict):
+    """Set environment variables that are not already set, and unset them afterwards."""
+    added = [name for name in values if name not in os.environ]
+    for name in added:
+        os.environ[name] = values[name]
+    try:
+        yield
+    finally:
+        for name in added:
+            os.environ.pop(name, None)
+
+
+def replay(
+    path,
+    output_dir: Optional[str] = None,
+    strict: bool = False,
+    simulate_latency: bool = False,
+) -> dict:
+    """
+    Re-execute a recorded run against its recorded responses, without network access.
+
+    Profiling and candidate scores are served from the trace too, so the replay takes the
+    same path as the recorded run whatever machine it runs on.
+
+    Args:
+        path: Trace file written by ``run(trace_path=...)``
+        output_dir: Directory for the replayed run's files (defaults to run()'s default)
+        strict: Fail on any request that was not recorded
+        simulate_latency: Reproduce the recorded provider and tool latencies
+
+    Returns:
+        The result of ``run()``, with replay statistics under ``replay``
+    """
+    # crewai checks the telemetry switches on every event, so they hold for the replay.
+    # litellm reads LITELLM_LOCAL_MODEL_COST_MAP only when first imported, so it only
+    # takes effect when the replay is what imports litellm, as from the command line.
+    with _environment_defaults(OFFLINE_ENVIRONMENT):
+        from engineering_team_agent import crew, main
+
+        trace = load_trace(path)
+        enable_code_execution = crew.ENABLE_CODE_EXECUTION
+        crew.ENABLE_CODE_EXECUTION = trace["header"].get("enable_code_execution", False)
+        try:
+            with ReplayEngine(trace, strict=strict, simulate_latency=simulate_latency) as engine:
+                result = main.run(**trace["header"]["run"], output_dir=output_dir)
+        finally:
+            crew.ENABLE_CODE_EXECUTION = enable_code_execution
+    result["replay"] = engine.stats
+    return result
+
+
+def summarize(trace: dict) -> dict:
+    """Aggregate call counts, time and tokens per model and per tool."""
+    summary = {"models": {}, "tools": {}, "duration": trace["end"].get("duration")}
+    for record in trace["llm"]:
+        model = summary["models"].setdefault(
+            record["model"],
+            {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0},
+        )
+        model["calls"] += 1
+        model["seconds"] += record["duration"]
+        model["prompt_tokens"] += record["usage"].get("prompt_tokens") or 0
+        model["completion_tokens"] += record["usage"].get("completion_tokens") or 0
+    for record in trace["tool"]:
+        tool = summary["tools"].setdefault(record["tool"], {"calls": 0, "seconds": 0.0})
+        tool["calls"] += 1
+        tool["seconds"] += record["duration"]
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command line entry point: replay or summarise a trace."""
+    parser = argparse.ArgumentParser(description="Replay or summarise a recorded run trace.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay_parser = commands.add_parser("replay", help="Re-execute a run offline")
+    replay_parser.add_argument("trace", type=Path)
+    replay_parser.add_argument("--output-dir")
+    replay_parser.add_argument("--strict", action="store_true")
+    replay_parser.add_argument("--simulate-latency", action="store_true")
+    summary_parser = commands.add_parser("summary", help="Print per-model and per-tool timings")
+    summary_parser.add_argument("trace", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "summary":
+        print(json.dumps(summarize(load_trace(args.trace)), indent=2))
+        return 0
+
+    result = replay(
+        args.trace,
+        output_dir=args.output_dir,
+        strict=args.strict,
+        simulate_latency=args.simulate_latency,
+    )
+    print(json.dumps({key: result.get(key) for key in ("success", "error", "replay")}, indent=2))
+    return 0 if result["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Unit tests for the bounded code interpreter tool."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from crewai_tools import CodeInterpreterTool
+
+from engineering_team_agent.scheduler import ExecutionScheduler
+from engineering_team_agent.tools.code_interpreter import (
+    BoundedCodeInterpreterTool,
+    container_limits,
+)
+
+
+@pytest.fixture
+def limits():
+    """Scheduler with small limits, patched in for the tool."""
+    scheduler = ExecutionScheduler(memory_limit_mb=256, cpu_seconds=30, cpus=0.5)
+    with patch("engineering_team_agent.tools.code_interpreter.scheduler", scheduler):
+        yield scheduler
+
+
+class TestBoundedCodeInterpreterTool:
+    """Test cases for BoundedCodeInterpreterTool."""
+
+    @pytest.mark.unit
+    def test_container_limits(self, limits):
+        """Test translating scheduler limits into docker options."""
+        options = container_limits(limits)
+
+        assert options["mem_limit"] == "256m"
+        assert options["memswap_limit"] == "256m"
+        assert options["nano_cpus"] == 500_000_000
+        assert options["ulimits"][0]["Name"] == "cpu"
+        assert options["ulimits"][0]["Hard"] == 30
+
+    @pytest.mark.unit
+    def test_container_limits_disabled(self):
+        """Test that unset limits add no docker options."""
+        scheduler = ExecutionScheduler(memory_limit_mb=None, cpu_seconds=None, cpus=None)
+        assert container_limits(scheduler) == {}
+
+    @pytest.mark.unit
+    def test_run_holds_a_scheduler_slot(self, limits):
+        """Test that each call waits for and is counted against the run's slot."""
+        tool = BoundedCodeInterpreterTool(run_id="run-1")
+        running = []
+
+        def run_code(**kwargs):
+            running.append(limits.running)
+            return "ok"
+
+        with patch.object(CodeInterpreterTool, "_run", side_effect=run_code):
+            assert tool.run(code="print(1)", libraries_used=[]) == "ok"
+
+        assert running == [1]
+        assert limits.stats("run-1")["executions"] == 1
+
+    @pytest.mark.unit
+    def test_container_gets_limits_and_unique_name(self, limits):
+        """Test that containers are resource-limited and never shared between calls."""
+        client = MagicMock()
+        with patch(
+            "engineering_team_agent.tools.code_interpreter.docker_from_env", return_value=client
+        ):
+            tool = BoundedCodeInterpreterTool()
+            tool._init_docker_container()
+            tool._init_docker_container()
+
+        first, second = (call.kwargs for call in client.containers.run.call_args_list)
+        assert first["mem_limit"] == "256m"
+        assert first["nano_cpus"] == 500_000_000
+        assert first["name"] != second["name"]
+
+    @pytest.mark.unit
+    def test_no_in_process_fallback(self):
+        """Test that code is never run in-process when Docker is unavailable."""
+        tool = BoundedCodeInterpreterTool()
+        assert "Docker" in tool.run_code_in_restricted_sandbox("result = 1")
+
+    @pytest.mark.unit
+    def test_docker_execution_has_a_deadline(self, limits):
+        """Test that code runs under timeout and a timed-out call says so."""
+        limits.wall_seconds = 7
+        container = MagicMock()
+        container.exec_run.return_value = MagicMock(exit_code=124, output=b"partial")
+        tool = BoundedCodeInterpreterTool()
+        with patch.object(tool, "_verify_docker_image"), patch.object(
+            tool, "_init_docker_container", return_value=container
+        ):
+            result = tool.run_code_in_docker("while True: pass", [])
+
+        command = container.exec_run.call_args.args[0]
+        assert command[0] == "timeout"
+        assert command[-4:] == ["7", "python3", "-c", "while True: pass"]
+        assert "7 seconds" in result
+        container.remove.assert_called_once_with(force=True)
+
+    @pytest.mark.unit
+    def test_container_removed_when_execution_fails(self, limits):
+        """Test that the container is removed even if the execution raises."""
+        container = MagicMock()
+        container.exec_run.side_effect = RuntimeError("docker went away")
+        tool = BoundedCodeInterpreterTool()
+        with patch.object(tool, "_verify_docker_image"), patch.object(
+            tool, "_init_docker_container", return_value=container
+        ), pytest.raises(RuntimeError):
+            tool.run_code_in_docker("print(1)", ["numpy"])
+
+        container.remove.assert_called_once_with(force=True)
@@ -2,7 +2,9 @@
 
 import pytest
 from unittest.mock import Mock, MagicMock, patch
-from engineering_team_agent.crew import EngineeringTeam
+from engineering_team_agent import crew
+from engineering_team_agent.crew import CACHE_CONTROL_INJECTION_POINTS, EngineeringTeam, build_llm
+from engineering_team_agent.tools.code_interpreter import BoundedCodeInterpreterTool
 
 
 class TestEngineeringTeam:
@@ -45,6 +47,13 @@ class TestEngineeringTeam:
         agent = team.test_engineer()
         assert agent is not None
 
+    @pytest.mark.unit
+    def test_performance_engineer_agent(self):
+        """Test performance_engineer agent creation."""
+        team = EngineeringTeam()
+        agent = team.performance_engineer()
+        assert agent is not None
+
     @pytest.mark.unit
     def test_design_task(self):
         """Test design_task creation."""
@@ -79,3 +88,118 @@ class TestEngineeringTeam:
         team = EngineeringTeam()
         crew_instance = team.crew()
         assert crew_instance is not None
+
+    @pytest.mark.unit
+    def test_benchmark_task(self):
+        """Test benchmark_task creation."""
+        team = EngineeringTeam()
+        task = team.benchmark_task()
+        assert task is not None
+
+    @pytest.mark.unit
+    def test_crew_excludes_benchmark_task_by_default(self):
+        """Test that the benchmark task only runs when profiling is enabled."""
+        team = EngineeringTeam(enable_profiling=False)
+        crew_instance = team.crew()
+        assert team.benchmark_task() not in crew_instance.tasks
+        assert len(crew_instance.tasks) == 4
+
+    @pytest.mark.unit
+    def test_crew_with_profiling(self):
+        """Test crew creation with the benchmark task enabled."""
+        team = EngineeringTeam(enable_profiling=True)
+        crew_instance = team.crew()
+        assert len(crew_instance.tasks) == 5
+
+    @pytest.mark.unit
+    def test_backend_model_override(self):
+        """Test overriding the backend engineer's model for a candidate."""
+        team = EngineeringTeam(backend_model="gpt-4o")
+        assert team.backend_engineer().llm is build_llm("gpt-4o")
+
+    @pytest.mark.unit
+    def test_code_execution_uses_bounded_interpreter(self, monkeypatch):
+        """Test that agents execute code through the scheduler-bound interpreter."""
+        monkeypatch.setattr(crew, "ENABLE_CODE_EXECUTION", True)
+        team = EngineeringTeam(run_id="run-1")
+        for agent in (team.backend_engineer(), team.test_engineer()):
+            assert not agent.allow_code_execution
+            assert isinstance(agent.tools[0], BoundedCodeInterpreterTool)
+            assert agent.tools[0].run_id == "run-1"
+
+    @pytest.mark.unit
+    def test_best_of_n_crews(self):
+        """Test creation of the crews used for best-of-N generation."""
+        team = EngineeringTeam(enable_profiling=False)
+        assert team.design_crew().tasks == [team.design_task()]
+        assert team.candidate_crew().tasks == [team.code_task()]
+        spec_crew = team.spec_crew()
+        assert spec_crew.agents == [team.test_engineer(), team.performance_engineer()]
+        assert all(t.context == [team.design_task()] for t in spec_crew.tasks)
+        # Only used for scoring candidates, never part of the full crew
+        assert len(team.crew().tasks) == 4
+        assert team.delivery_crew().tasks == [team.frontend_task(), team.test_task()]
+
+    @pytest.mark.unit
+    def test_delivery_crew_with_profiling(self):
+        """Test that the delivery crew writes the benchmark harness when profiling."""
+        team = EngineeringTeam(enable_profiling=True)
+        assert team.benchmark_task() in team.delivery_crew().tasks
+
+    @pytest.mark.unit
+    def test_optimize_crew(self):
+        """Test creation of the crew that revises the module for performance."""
+        team = EngineeringTeam()
+        crew_instance = team.optimize_crew()
+        assert len(crew_instance.tasks) == 1
+
+    @pytest.mark.unit
+    def test_agent_prompts_are_static(self):
+        """Test that agent prompts do not interpolate run inputs, so their prefix caches."""
+        team = EngineeringTeam()
+        for name, config in team.agents_config.items():
+            for field in ("role", "goal", "backstory"):
+                assert "{" not in config[field], f"{name}.{field} interpolates run inputs"
+
+    @pytest.mark.unit
+    def test_agents_share_llm_instances(self):
+        """Test that agents using the same model share one LLM."""
+        team = EngineeringTeam()
+        assert team.backend_engineer().llm is team.test_engineer().llm
+
+
+class TestBuildLlm:
+    """Test cases for build_llm."""
+
+    @pytest.mark.unit
+    def test_anthropic_models_get_cache_markers(self):
+        """Test that Anthropic models mark the system prompt for caching."""
+        llm = build_llm("anthropic/claude-3-7-sonnet-latest")
+        assert llm.additional_params["cache_control_injection_points"] == (
+            CACHE_CONTROL_INJECTION_POINTS
+        )
+
+    @pytest.mark.unit
+    def test_cache_markers_cover_multi_turn_prefix(self):
+        """Test that the last message is marked so agent loops reuse the conversation."""
+        assert {"location": "message", "role": "system"} in CACHE_CONTROL_INJECTION_POINTS
+        assert {"location": "message", "index": -1} in CACHE_CONTROL_INJECTION_POINTS
+
+    @pytest.mark.unit
+    def test_other_models_have_no_cache_markers(self):
+        """Test that other models rely on automatic prefix caching."""
+        llm = build_llm("gpt-4o")
+        assert "cache_control_injection_points" not in llm.additional_params
+
+    @pytest.mark.unit
+    def test_build_llm_is_shared(self):
+        """Test that the same model always returns the same LLM."""
+        assert build_llm("gpt-4o") is build_llm("gpt-4o")
+
+    @pytest.mark.unit
+    def test_lanes_get_their_own_llm(self):
+        """Test that a lane's calls are tagged so traces can tell candidates apart."""
+        llm = build_llm("gpt-4o", "candidate-0")
+        assert llm.additional_params["metadata"] == {"lane": "candidate-0"}
+        assert llm is not build_llm("gpt-4o")
+        assert "metadata" not in build_llm("gpt-4o").additional_params
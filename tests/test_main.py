@@ -2,8 +2,13 @@
 
 import pytest
 from pathlib import Path
-from unittest.mock import Mock, MagicMock, patch
-from engineering_team_agent.main import run
+from unittest.mock import ANY, Mock, MagicMock, patch
+from engineering_team_agent.main import (
+    enforce_performance_budget,
+    run,
+    run_best_of_n,
+    usage_metrics,
+)
 
 
 class TestMain:
@@ -123,3 +128,331 @@ class TestMain:
             assert inputs["requirements"] == sample_requirements
             assert inputs["module_name"] == "custom_module.py"
             assert inputs["class_name"] == "CustomClass"
+
+    @pytest.mark.unit
+    def test_run_with_profile(self, test_output_dir, sample_requirements):
+        """Test that run profiles the module when requested."""
+        with patch("engineering_team_agent.main.EngineeringTeam") as mock_team_class, patch(
+            "engineering_team_agent.main.profiling.profile_module"
+        ) as mock_profile:
+            mock_team_class.return_value = MagicMock()
+            mock_profile.return_value = {"within_budget": True, "measurements": {}}
+
+            result = run(
+                requirements=sample_requirements,
+                module_name="test.py",
+                class_name="Test",
+                output_dir=str(test_output_dir),
+                profile=True,
+            )
+
+            assert result["success"] is True
+            assert result["performance"]["within_budget"] is True
+            assert result["performance"]["rounds"] == 0
+            assert "execution" in result["metrics"]
+            mock_team_class.assert_called_once_with(enable_profiling=True, run_id=ANY)
+
+    @pytest.mark.unit
+    def test_run_profile_defaults_to_enable_profiling(self, test_output_dir, sample_requirements):
+        """Test that ENABLE_PROFILING turns profiling on when profile is not given."""
+        with patch("engineering_team_agent.main.EngineeringTeam") as mock_team_class, patch(
+            "engineering_team_agent.main.profiling.profile_module"
+        ) as mock_profile, patch("engineering_team_agent.main.crew.ENABLE_PROFILING", True):
+            mock_team_class.return_value = MagicMock()
+            mock_profile.return_value = {"within_budget": True, "measurements": {}}
+
+            result = run(requirements=sample_requirements, output_dir=str(test_output_dir))
+
+            assert result["success"] is True
+            assert "performance" in result
+            mock_team_class.assert_called_once_with(enable_profiling=True, run_id=ANY)
+
+    @pytest.mark.unit
+    def test_enforce_performance_budget_sends_report_to_backend(self, test_output_dir):
+        """Test that budget violations are handed back to the backend engineer."""
+        (test_output_dir / "test.py").write_text("class Test: pass\n")
+        mock_team = MagicMock()
+        inputs = {"requirements": "r", "module_name": "test.py", "class_name": "Test"}
+        over_budget = {
+            "within_budget": False,
+            "measurements": {"holdings": {}},
+            "report": "holdings: O(n^2)",
+        }
+        within_budget = {"within_budget": True, "measurements": {"holdings": {}}}
+
+        with patch("engineering_team_agent.main.profiling.profile_module") as mock_profile:
+            mock_profile.side_effect = [over_budget, within_budget]
+            performance = enforce_performance_budget(mock_team, inputs, test_output_dir)
+
+        assert performance["within_budget"] is True
+        assert performance["rounds"] == 1
+        kickoff_inputs = mock_team.optimize_crew.return_value.kickoff.call_args[1]["inputs"]
+        assert kickoff_inputs["profile_report"] == "holdings: O(n^2)"
+        assert kickoff_inputs["code"] == "class Test: pass\n"
+
+    @pytest.mark.unit
+    def test_enforce_performance_budget_stops_after_max_rounds(self, test_output_dir):
+        """Test that optimization stops after the configured number of rounds."""
+        (test_output_dir / "test.py").write_text("class Test: pass\n")
+        mock_team = MagicMock()
+        inputs = {"requirements": "r", "module_name": "test.py", "class_name": "Test"}
+
+        with patch("engineering_team_agent.main.profiling.profile_module") as mock_profile:
+            mock_profile.side_effect = lambda *a, **k: {
+                "within_budget": False,
+                "measurements": {"holdings": {}},
+                "report": "slow",
+            }
+            performance = enforce_performance_budget(
+                mock_team, inputs, test_output_dir, max_optimization_rounds=2
+            )
+
+        assert performance["within_budget"] is False
+        assert performance["rounds"] == 2
+        assert mock_team.optimize_crew.return_value.kickoff.call_count == 2
+
+    @pytest.mark.unit
+    def test_enforce_performance_budget_reverts_failing_rewrite(self, test_output_dir):
+        """Test that a rewrite breaking the generated tests is discarded."""
+        original = "class Test:\n    def value(self):\n        return 1\n"
+        (test_output_dir / "test.py").write_text(original)
+        (test_output_dir / "test_test.py").write_text(
+            "from test import Test\ndef test_value():\n    assert Test().value() == 1\n"
+        )
+        mock_team = MagicMock()
+        mock_team.optimize_crew.return_value.kickoff.side_effect = lambda inputs: (
+            test_output_dir / "test.py"
+        ).write_text("class Test:\n    def value(self):\n        return 2\n")
+        inputs = {"requirements": "r", "module_name": "test.py", "class_name": "Test"}
+
+        with patch("engineering_team_agent.main.profiling.profile_module") as mock_profile:
+            mock_profile.side_effect = lambda *a, **k: {
+                "within_budget": False,
+                "measurements": {"value": {}},
+                "report": "slow",
+            }
+            performance = enforce_performance_budget(
+                mock_team, inputs, test_output_dir, max_optimization_rounds=1
+            )
+
+        assert performance["rounds"] == 1
+        assert performance["reverted"] == 1
+        assert (test_output_dir / "test.py").read_text() == original
+        assert not (test_output_dir / "junit.xml").exists()
+
+    @pytest.mark.unit
+    def test_enforce_performance_budget_stops_on_broken_harness(self, test_output_dir):
+        """Test that a harness that fails to run is not sent to the backend engineer."""
+        (test_output_dir / "test.py").write_text("class Test: pass\n")
+        mock_team = MagicMock()
+        inputs = {"requirements": "r", "module_name": "test.py", "class_name": "Test"}
+
+        with patch("engineering_team_agent.main.profiling.profile_module") as mock_profile:
+            mock_profile.return_value = {
+                "within_budget": False,
+                "measurements": {"harness": {"error": "SyntaxError: invalid syntax"}},
+                "report": "harness: ERROR",
+            }
+            performance = enforce_performance_budget(mock_team, inputs, test_output_dir)
+
+        assert performance["within_budget"] is False
+        assert performance["rounds"] == 0
+        assert mock_profile.call_count == 1
+        mock_team.optimize_crew.assert_not_called()
+
+    @pytest.mark.unit
+    def test_run_counts_optimization_usage(self, test_output_dir, sample_requirements):
+        """Test that optimization kickoffs are included in the run's token usage."""
+        (test_output_dir / "test.py").write_text("class Test: pass\n")
+        over_budget = {
+            "within_budget": False,
+            "measurements": {"holdings": {}},
+            "report": "holdings: O(n^2)",
+        }
+        within_budget = {"within_budget": True, "measurements": {"holdings": {}}}
+        with patch("engineering_team_agent.main.EngineeringTeam") as mock_team_class, patch(
+            "engineering_team_agent.main.profiling.profile_module"
+        ) as mock_profile:
+            mock_team = MagicMock()
+            mock_team.crew.return_value.kickoff.return_value.token_usage.prompt_tokens = 1000
+            optimize_result = mock_team.optimize_crew.return_value.kickoff.return_value
+            optimize_result.token_usage.prompt_tokens = 400
+            mock_team_class.return_value = mock_team
+            mock_profile.side_effect = [over_budget, within_budget]
+
+            result = run(
+                requirements=sample_requirements,
+                module_name="test.py",
+                class_name="Test",
+                output_dir=str(test_output_dir),
+                profile=True,
+            )
+
+        assert result["success"] is True
+        assert result["performance"]["rounds"] == 1
+        assert result["metrics"]["prompt_tokens"] == 1400
+        assert result["result"] is mock_team.crew.return_value.kickoff.return_value
+
+    @pytest.mark.unit
+    def test_usage_metrics_reports_cache_hit_rate(self):
+        """Test cache hit rate reporting from crew token usage."""
+        result = MagicMock()
+        result.token_usage.prompt_tokens = 1000
+        result.token_usage.cached_prompt_tokens = 750
+        result.token_usage.completion_tokens = 200
+        result.token_usage.total_tokens = 1200
+        result.token_usage.successful_requests = 4
+
+        metrics = usage_metrics(result)
+
+        assert metrics["prompt_tokens"] == 1000
+        assert metrics["cached_prompt_tokens"] == 750
+        assert metrics["cache_hit_rate"] == pytest.approx(0.75)
+
+    @pytest.mark.unit
+    def test_usage_metrics_without_usage(self):
+        """Test metrics when the crew reported no token usage."""
+        metrics = usage_metrics(object())
+        assert metrics["prompt_tokens"] == 0
+        assert metrics["cache_hit_rate"] == 0.0
+
+    @pytest.mark.unit
+    def test_run_best_of_n_delivers_winner(self, test_output_dir):
+        """Test that only the best scored candidate is delivered."""
+        inputs = {
+            "requirements": "r",
+            "module_name": "test.py",
+            "class_name": "Test",
+            "output_dir": str(test_output_dir),
+        }
+        sources = ["class Test(:\n", "class Test:\n    pass\n"]
+
+        def make_team(*args, **kwargs):
+            team = MagicMock()
+
+            def kickoff(inputs):
+                Path(inputs["output_dir"], "test.py").write_text(
+                    sources[int(Path(inputs["output_dir"]).name)]
+                )
+                return MagicMock()
+
+            team.candidate_crew.return_value.kickoff.side_effect = kickoff
+            teams.append(team)
+            return team
+
+        teams = []
+        with patch(
+            "engineering_team_agent.main.EngineeringTeam", side_effect=make_team
+        ) as mock_team_class:
+            crew_instance, results, chosen = run_best_of_n(
+                inputs, test_output_dir, candidates=2, candidate_models=["gpt-4o"], run_id="run"
+            )
+
+        # teams[0] is the lead; candidates follow
+        assert chosen["winner"] == 1
+        assert chosen["models"] == ["gpt-4o", "gpt-4o"]
+        assert crew_instance is teams[2]
+        assert (test_output_dir / "test.py").read_text() == sources[1]
+        crew_instance.delivery_crew.return_value.kickoff.assert_called_once_with(inputs=inputs)
+        # design, tests, two candidates and delivery
+        assert len(results) == 5
+        # Candidates execute in their own lanes of the run
+        lanes = [call.kwargs.get("lane") for call in mock_team_class.call_args_list]
+        assert lanes == [None, "candidate-0", "candidate-1"]
+
+    @pytest.mark.unit
+    def test_run_best_of_n_scores_against_tests_for_this_run(self, test_output_dir):
+        """Test that candidates are scored against tests and a benchmark from this run's design."""
+        inputs = {
+            "requirements": "r",
+            "module_name": "test.py",
+            "class_name": "Test",
+            "output_dir": str(test_output_dir),
+        }
+        # Left by an earlier delivery; would favour the first candidate
+        (test_output_dir / "test_test.py").write_text(
+            "from test import Test\ndef test_value():\n    assert Test().value == 1\n"
+        )
+        sources = ["class Test:\n    value = 1\n", "class Test:\n    value = 2\n"]
+
+        def write_spec(inputs):
+            Path(inputs["output_dir"], "test_test.py").write_text(
+                "from test import Test\ndef test_value():\n    assert Test().value == 2\n"
+            )
+            Path(inputs["output_dir"], "bench_test.py").write_text(
+                "from test import Test\n\n\ndef workloads():\n    return {'value': lambda n: Test().value}\n"
+            )
+            return MagicMock()
+
+        def write_candidate(inputs):
+            Path(inputs["output_dir"], "test.py").write_text(
+                sources[int(Path(inputs["output_dir"]).name)]
+            )
+            return MagicMock()
+
+        def make_team(*args, **kwargs):
+            team = MagicMock()
+            team.spec_crew.return_value.kickoff.side_effect = write_spec
+            team.candidate_crew.return_value.kickoff.side_effect = write_candidate
+            return team
+
+        with patch("engineering_team_agent.main.EngineeringTeam", side_effect=make_team):
+            _, _, chosen = run_best_of_n(inputs, test_output_dir, candidates=2)
+
+        assert chosen["winner"] == 1
+        assert [score["test_pass_rate"] for score in chosen["scores"]] == [0.0, 1.0]
+        assert all(score["within_budget"] is not None for score in chosen["scores"])
+        assert (test_output_dir / "candidates" / "spec" / "test_test.py").exists()
+        assert (test_output_dir / "candidates" / "spec" / "bench_test.py").exists()
+
+    @pytest.mark.unit
+    def test_run_best_of_n_all_candidates_fail(self, test_output_dir):
+        """Test that run reports an error when no candidate is usable."""
+        with patch("engineering_team_agent.main.EngineeringTeam") as mock_team_class:
+            mock_team = MagicMock()
+            mock_team.candidate_crew.return_value.kickoff.side_effect = Exception("provider down")
+            mock_team_class.return_value = mock_team
+
+            result = run(
+                requirements="r",
+                module_name="test.py",
+                class_name="Test",
+                output_dir=str(test_output_dir),
+                candidates=2,
+            )
+
+        assert result["success"] is False
+        assert "candidate" in result["error"]
+
+    @pytest.mark.unit
+    def test_usage_metrics_sums_results(self):
+        """Test that usage is summed across several kickoffs."""
+        first, second = MagicMock(), MagicMock()
+        for result in (first, second):
+            result.token_usage.prompt_tokens = 100
+            result.token_usage.cached_prompt_tokens = 50
+        metrics = usage_metrics(first, second)
+
+        assert metrics["prompt_tokens"] == 200
+        assert metrics["cache_hit_rate"] == pytest.approx(0.5)
+
+    @pytest.mark.unit
+    def test_run_records_trace(self, test_output_dir, sample_requirements):
+        """Test that run records a trace when asked to."""
+        trace_path = test_output_dir / "trace.jsonl.gz"
+        with patch("engineering_team_agent.main.EngineeringTeam") as mock_team_class, patch(
+            "engineering_team_agent.main.tracing.TraceRecorder"
+        ) as mock_recorder_class:
+            mock_team_class.return_value = MagicMock()
+
+            result = run(
+                requirements=sample_requirements,
+                output_dir=str(test_output_dir),
+                trace_path=str(trace_path),
+            )
+
+        assert result["success"] is True
+        assert result["trace_path"] == str(trace_path)
+        header = mock_recorder_class.call_args[0][1]
+        assert header["run"]["requirements"] == sample_requirements
+        assert mock_recorder_class.return_value.__enter__.return_value.success is True
@@ -0,0 +1,196 @@
+"""Unit tests for the profiling stage."""
+
+import pytest
+
+from engineering_team_agent.profiling import (
+    check_budget,
+    fit_complexity,
+    format_report,
+    measure_workloads,
+    profile_module,
+)
+
+BENCH_SOURCE = '''
+from accounts import Account
+
+
+def workloads():
+    def balance(n):
+        account = Account(n)
+        return account.balance
+
+    return {"balance": balance}
+'''
+
+
+class TestProfiling:
+    """Test cases for profiling module."""
+
+    @pytest.mark.unit
+    def test_fit_complexity_linear(self):
+        """Test fitting a linear curve."""
+        assert fit_complexity([100, 200, 400], [1.0, 2.0, 4.0]) == pytest.approx(1.0)
+
+    @pytest.mark.unit
+    def test_fit_complexity_quadratic(self):
+        """Test fitting a quadratic curve."""
+        assert fit_complexity([100, 200, 400], [1.0, 4.0, 16.0]) == pytest.approx(2.0)
+
+    @pytest.mark.unit
+    def test_fit_complexity_single_point(self):
+        """Test fitting with too few points."""
+        assert fit_complexity([100], [1.0]) == 0.0
+
+    @pytest.mark.unit
+    def test_measure_workloads(self):
+        """Test measuring a workload at increasing sizes."""
+        data = list(range(1000))
+        measurements = measure_workloads({"sum": lambda n: lambda: sum(data[:n])}, (10, 100))
+
+        assert measurements["sum"]["sizes"] == [10, 100]
+        assert len(measurements["sum"]["seconds"]) == 2
+        assert "exponent" in measurements["sum"]
+        assert "sum" in measurements["sum"]["profile"]
+
+    @pytest.mark.unit
+    def test_measure_workloads_uses_fresh_state_per_call(self):
+        """Test that mutating workloads are always measured at size n."""
+        seen = []
+
+        def append(n):
+            transactions = list(range(n))
+
+            def call():
+                seen.append((n, len(transactions)))
+                transactions.append(n)
+
+            return call
+
+        measurements = measure_workloads({"append": append}, (10, 100))
+
+        assert "error" not in measurements["append"]
+        assert seen
+        assert all(size == n for n, size in seen)
+
+    @pytest.mark.unit
+    def test_measure_workloads_records_errors(self):
+        """Test that a failing workload is reported instead of raising."""
+
+        def broken(n):
+            raise ValueError("boom")
+
+        measurements = measure_workloads({"broken": broken}, (10, 100))
+        assert "boom" in measurements["broken"]["error"]
+
+    @pytest.mark.unit
+    def test_check_budget(self):
+        """Test budget violations for super-linear and slow workloads."""
+        measurements = {
+            "fast": {"sizes": [10, 100], "seconds": [1e-6, 1e-6], "exponent": 0.0},
+            "quadratic": {"sizes": [10, 100], "seconds": [1e-6, 1e-4], "exponent": 2.0},
+            "slow": {"sizes": [10, 100], "seconds": [1.0, 1.0], "exponent": 0.0},
+        }
+        violations = check_budget(measurements, max_exponent=1.3, max_seconds=0.01)
+
+        assert len(violations) == 2
+        assert violations[0].startswith("quadratic:")
+        assert violations[1].startswith("slow:")
+
+    @pytest.mark.unit
+    def test_check_budget_per_method_exponents(self):
+        """Test harness-declared and caller-given per-method budgets."""
+        measurements = {
+            "holdings": {"sizes": [10, 100], "seconds": [1e-6, 1e-5], "exponent": 1.0},
+            "transactions": {
+                "sizes": [10, 100],
+                "seconds": [1e-6, 1e-5],
+                "exponent": 1.0,
+                "max_exponent": 0.5,
+            },
+        }
+
+        assert [v.split(":")[0] for v in check_budget(measurements)] == ["transactions"]
+        violations = check_budget(measurements, method_exponents={"transactions": 1.3})
+        assert violations == []
+        violations = check_budget(measurements, method_exponents={"holdings": 0.5})
+        assert [v.split(":")[0] for v in violations] == ["holdings", "transactions"]
+        assert "budget is O(n^0.5)" in violations[0]
+
+    @pytest.mark.unit
+    def test_format_report_includes_profile_for_violations(self):
+        """Test that the report attaches the profile of violating workloads."""
+        measurements = {
+            "quadratic": {
+                "sizes": [10, 100],
+                "seconds": [1e-6, 1e-4],
+                "peak_bytes": [0, 0],
+                "exponent": 2.0,
+                "profile": "PROFILE OUTPUT",
+            }
+        }
+        report = format_report(measurements, check_budget(measurements))
+        assert "Budget violations" in report
+        assert "PROFILE OUTPUT" in report
+
+    @pytest.mark.unit
+    def test_profile_module(self, test_output_dir):
+        """Test running a generated harness in a subprocess."""
+        (test_output_dir / "accounts.py").write_text(
+            "class Account:\n"
+            "    def __init__(self, n):\n"
+            "        self.transactions = list(range(n))\n"
+            "    def balance(self):\n"
+            "        return sum(self.transactions)\n"
+        )
+        (test_output_dir / "bench_accounts.py").write_text(BENCH_SOURCE)
+
+        result = profile_module(test_output_dir, "accounts.py", sizes=(10, 100), max_seconds=1.0)
+
+        assert result["within_budget"] is True
+        assert "balance" in result["measurements"]
+
+    @pytest.mark.unit
+    def test_profile_module_without_harness(self, test_output_dir):
+        """Test profiling when no harness was generated."""
+        result = profile_module(test_output_dir, "accounts.py")
+
+        assert result["within_budget"] is False
+        assert "bench_accounts.py" in result["violations"][0]
+
+    @pytest.mark.unit
+    def test_profile_module_relative_output_dir(self, tmp_path, monkeypatch):
+        """Test profiling a module whose output directory is given relative to the cwd."""
+        monkeypatch.chdir(tmp_path)
+        output_dir = tmp_path / "out"
+        output_dir.mkdir()
+        (output_dir / "accounts.py").write_text(
+            "class Account:\n"
+            "    def __init__(self, n):\n"
+            "        self.transactions = list(range(n))\n"
+            "    def balance(self):\n"
+            "        return sum(self.transactions)\n"
+        )
+        (output_dir / "bench_accounts.py").write_text(BENCH_SOURCE)
+
+        result = profile_module("out", "accounts.py", sizes=(10, 100), max_seconds=1.0)
+
+        assert result["within_budget"] is True, result["report"]
+        assert "balance" in result["measurements"]
+
+    @pytest.mark.unit
+    def test_profile_module_reads_harness_budgets(self, test_output_dir):
+        """Test that budgets declared by the harness apply to their methods."""
+        (test_output_dir / "accounts.py").write_text(
+            "class Account:\n"
+            "    def __init__(self, n):\n"
+            "        self.transactions = list(range(n))\n"
+            "    def balance(self):\n"
+            "        return sum(self.transactions)\n"
+        )
+        (test_output_dir / "bench_accounts.py").write_text(
+            BENCH_SOURCE + "\n\ndef budgets():\n    return {'balance': 0.5}\n"
+        )
+
+        result = profile_module(test_output_dir, "accounts.py", sizes=(10, 100), max_seconds=1.0)
+
+        assert result["measurements"]["balance"]["max_exponent"] == 0.5
@@ -0,0 +1,119 @@
+"""Unit tests for the execution scheduler."""
+
+import sys
+import threading
+import time
+
+import pytest
+
+from engineering_team_agent.scheduler import ExecutionScheduler, lane_id, limit_command
+
+
+class TestExecutionScheduler:
+    """Test cases for ExecutionScheduler."""
+
+    @pytest.mark.unit
+    def test_global_cap_queues_executions(self):
+        """Test that no more than max_concurrent executions overlap."""
+        scheduler = ExecutionScheduler(max_concurrent=2, max_per_run=4)
+        peak = []
+        lock = threading.Lock()
+
+        def work(run_id):
+            with scheduler.slot(run_id):
+                with lock:
+                    peak.append(scheduler.running)
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=work, args=(f"run-{i}",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert max(peak) <= 2
+        assert scheduler.running == 0
+        assert scheduler.queued == 0
+
+    @pytest.mark.unit
+    def test_per_run_cap_records_queue_wait(self):
+        """Test that executions of one run queue behind each other and report the wait."""
+        scheduler = ExecutionScheduler(max_concurrent=4, max_per_run=1)
+
+        def work():
+            with scheduler.slot("run"):
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = scheduler.stats("run")
+        assert stats["executions"] == 2
+        assert stats["queue_seconds_max"] >= 0.04
+
+    @pytest.mark.unit
+    def test_lanes_run_in_parallel_and_report_under_the_run(self):
+        """Test that lanes of one run have their own cap but share the run's statistics."""
+        scheduler = ExecutionScheduler(max_concurrent=4, max_per_run=1)
+        peak = []
+        lock = threading.Lock()
+
+        def work(lane):
+            with scheduler.slot(lane_id("run", lane)):
+                with lock:
+                    peak.append(scheduler.running)
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=work, args=(f"candidate-{i}",)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert max(peak) == 2
+        assert scheduler.stats("run")["executions"] == 2
+        scheduler.finish_run("run")
+        assert scheduler._per_run == {}
+
+    @pytest.mark.unit
+    def test_finish_run_forgets_stats(self):
+        """Test that finishing a run returns and clears its statistics."""
+        scheduler = ExecutionScheduler()
+        with scheduler.slot("run"):
+            pass
+
+        assert scheduler.finish_run("run")["executions"] == 1
+        assert scheduler.stats("run")["executions"] == 0
+
+    @pytest.mark.unit
+    def test_run_returns_output(self):
+        """Test running a command under the scheduler."""
+        scheduler = ExecutionScheduler()
+        completed = scheduler.run(
+            [sys.executable, "-c", "print('hello')"], run_id="run", capture_output=True, text=True
+        )
+
+        assert completed.returncode == 0
+        assert completed.stdout.strip() == "hello"
+
+    @pytest.mark.unit
+    @pytest.mark.skipif(sys.platform == "win32", reason="rlimits are POSIX only")
+    def test_run_enforces_memory_limit(self):
+        """Test that a command allocating past the memory limit fails."""
+        scheduler = ExecutionScheduler(memory_limit_mb=256, cpu_seconds=None)
+        completed = scheduler.run(
+            [sys.executable, "-c", "data = bytearray(512 * 1024 * 1024)"],
+            capture_output=True,
+            text=True,
+        )
+
+        assert completed.returncode != 0
+        assert "MemoryError" in completed.stderr
+
+    @pytest.mark.unit
+    def test_limit_command_without_limits(self):
+        """Test that commands run unwrapped when no limits are configured."""
+        assert limit_command(["echo", "hi"], None, None) == ["echo", "hi"]
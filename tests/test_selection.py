@@ -0,0 +1,79 @@
+"""Unit tests for best-of-N candidate selection."""
+
+import pytest
+
+from engineering_team_agent.selection import failed_score, score_candidate, select_best
+
+
+def write_candidate(directory, source):
+    """Write a candidate accounts.py into its own directory."""
+    directory.mkdir(parents=True)
+    module_file = directory / "accounts.py"
+    module_file.write_text(source)
+    return module_file
+
+
+class TestSelection:
+    """Test cases for selection module."""
+
+    @pytest.mark.unit
+    def test_score_candidate_syntax_error(self, tmp_path):
+        """Test that a candidate that does not parse scores no further signals."""
+        module_file = write_candidate(tmp_path / "0", "class Account(:\n")
+        score = score_candidate(module_file, "Account")
+
+        assert score["parses"] is False
+        assert score["imports"] is False
+
+    @pytest.mark.unit
+    def test_score_candidate_missing_class(self, tmp_path):
+        """Test that a candidate without the requested class does not import."""
+        module_file = write_candidate(tmp_path / "0", "class Other:\n    pass\n")
+        score = score_candidate(module_file, "Account")
+
+        assert score["parses"] is True
+        assert score["imports"] is False
+
+    @pytest.mark.unit
+    def test_score_candidate_runs_reference_tests(self, tmp_path):
+        """Test that tests from a previous delivery are run against the candidate."""
+        reference_dir = tmp_path / "output"
+        reference_dir.mkdir()
+        (reference_dir / "test_accounts.py").write_text(
+            "from accounts import Account\n"
+            "def test_total():\n"
+            "    assert Account().total() == 2\n"
+        )
+        passing = write_candidate(
+            tmp_path / "0", "class Account:\n    def total(self):\n        return 2\n"
+        )
+        failing = write_candidate(
+            tmp_path / "1", "class Account:\n    def total(self):\n        return 1\n"
+        )
+
+        assert score_candidate(passing, "Account", reference_dir)["test_pass_rate"] == 1.0
+        assert score_candidate(failing, "Account", reference_dir)["test_pass_rate"] == 0.0
+
+    @pytest.mark.unit
+    def test_select_best_prefers_working_candidate(self, tmp_path):
+        """Test that a working candidate beats broken ones."""
+        scores = [
+            failed_score("provider error"),
+            score_candidate(write_candidate(tmp_path / "1", "class Account(:\n"), "Account"),
+            score_candidate(
+                write_candidate(tmp_path / "2", "class Account:\n    pass\n"), "Account"
+            ),
+        ]
+        assert select_best(scores) == 2
+
+    @pytest.mark.unit
+    def test_select_best_prefers_earlier_on_tie(self, tmp_path):
+        """Test that ties go to the earlier candidate."""
+        scores = [failed_score("a"), failed_score("b")]
+        assert select_best(scores) == 0
+
+    @pytest.mark.unit
+    def test_select_best_without_candidates(self):
+        """Test selecting from an empty list."""
+        with pytest.raises(ValueError):
+            select_best([])
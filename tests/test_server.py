@@ -0,0 +1,280 @@
+"""Unit tests for the HTTP API server."""
+
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+import litellm
+import pytest
+
+from engineering_team_agent import crew
+from engineering_team_agent.server import EngineeringTeamServer, parse_run_request, request_key
+
+FINAL_ANSWER = "Thought: I now can give a great answer\nFinal Answer: class Account:\n    pass\n"
+
+
+async def call(app, method, path, body=None):
+    """Send one request to an ASGI app and return (status, headers, body)."""
+    request = json.dumps(body).encode() if body is not None else b""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": request, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "method": method, "path": path}, receive, send)
+    start = messages[0]
+    content = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], dict(start["headers"]), content
+
+
+async def wait_until_done(app, run_id):
+    """Poll a run until it finishes."""
+    while True:
+        _, _, content = await call(app, "GET", f"/runs/{run_id}")
+        data = json.loads(content)
+        if data["status"] in ("succeeded", "failed"):
+            return data
+        await asyncio.sleep(0.01)
+
+
+class FakeRunner:
+    """Stand-in for run() that writes artifacts without calling any LLM."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, requirements, module_name="accounts.py", class_name="Account", **kwargs):
+        self.calls.append(kwargs)
+        self.release.wait(timeout=5)
+        output_dir = Path(kwargs["output_dir"])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / module_name).write_text(f"class {class_name}:\n    pass\n")
+        return {"success": True, "result": "done", "output_dir": str(output_dir)}
+
+
+def fake_completion(model, messages, **kwargs):
+    """Stand-in provider giving every agent the same final answer."""
+    return litellm.ModelResponse(
+        model=model,
+        choices=[
+            {"message": {"role": "assistant", "content": FINAL_ANSWER}, "finish_reason": "stop"}
+        ],
+        usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    )
+
+
+@pytest.fixture
+def fake_runner():
+    """Fake runner standing in for the crew."""
+    return FakeRunner()
+
+
+@pytest.fixture
+def server(fake_runner, tmp_path):
+    """Server wired to the fake runner."""
+    return EngineeringTeamServer(runner=fake_runner, output_dir=tmp_path / "runs")
+
+
+class TestServer:
+    """Test cases for server module."""
+
+    @pytest.mark.unit
+    def test_request_key_is_order_independent(self):
+        """Test that identical inputs hash the same regardless of key order."""
+        assert request_key({"a": 1, "b": 2}) == request_key({"b": 2, "a": 1})
+        assert request_key({"a": 1}) != request_key({"a": 2})
+
+    @pytest.mark.unit
+    def test_parse_run_request_validation(self):
+        """Test request body validation."""
+        assert parse_run_request(b'{"requirements": "r"}') == {"requirements": "r"}
+        with pytest.raises(ValueError):
+            parse_run_request(b"{}")
+        with pytest.raises(ValueError):
+            parse_run_request(b'{"requirements": "r", "unknown": 1}')
+        with pytest.raises(ValueError):
+            parse_run_request(b'{"requirements": "r", "candidates": true}')
+        with pytest.raises(ValueError):
+            parse_run_request(b"not json")
+        with pytest.raises(TypeError):
+            parse_run_request(b'["r"]')
+
+    @pytest.mark.unit
+    def test_health(self, server):
+        """Test the health endpoint."""
+        status, _, content = asyncio.run(call(server, "GET", "/health"))
+        assert status == 200
+        assert json.loads(content) == {"status": "ok"}
+
+    @pytest.mark.unit
+    def test_submit_and_fetch_artifacts(self, server):
+        """Test submitting a run and downloading its artifacts."""
+
+        async def scenario():
+            status, _, content = await call(
+                server, "POST", "/runs", {"requirements": "r", "module_name": "bank.py"}
+            )
+            assert status == 202
+            run_id = json.loads(content)["id"]
+
+            data = await wait_until_done(server, run_id)
+            assert data["status"] == "succeeded"
+            assert data["result"] == "done"
+            assert data["queue_seconds"] >= 0
+
+            _, _, content = await call(server, "GET", f"/runs/{run_id}/artifacts")
+            assert json.loads(content)["artifacts"] == ["bank.py"]
+
+            status, _, content = await call(server, "GET", f"/runs/{run_id}/artifacts/bank.py")
+            assert status == 200
+            assert content.startswith(b"class Account")
+
+            status, _, _ = await call(server, "GET", f"/runs/{run_id}/artifacts/../secret")
+            assert status == 404
+
+        asyncio.run(scenario())
+
+    @pytest.mark.unit
+    def test_identical_requests_are_coalesced(self, server, fake_runner):
+        """Test that identical in-flight requests share one crew execution."""
+        fake_runner.release.clear()
+
+        async def scenario():
+            _, _, first = await call(server, "POST", "/runs", {"requirements": "r"})
+            _, _, second = await call(server, "POST", "/runs", {"requirements": "r"})
+            _, _, defaulted = await call(
+                server, "POST", "/runs", {"requirements": "r", "module_name": "accounts.py"}
+            )
+            _, _, other = await call(server, "POST", "/runs", {"requirements": "other"})
+            first, second, other = json.loads(first), json.loads(second), json.loads(other)
+            defaulted = json.loads(defaulted)
+
+            assert second["coalesced"] is True
+            assert defaulted["id"] == first["id"]
+            assert second["id"] == first["id"]
+            assert other["id"] != first["id"]
+
+            fake_runner.release.set()
+            await wait_until_done(server, first["id"])
+            await wait_until_done(server, other["id"])
+
+        asyncio.run(scenario())
+        assert len(fake_runner.calls) == 2
+
+    @pytest.mark.unit
+    def test_stream(self, server):
+        """Test streaming status changes until the run finishes."""
+
+        async def scenario():
+            _, _, content = await call(server, "POST", "/runs", {"requirements": "r"})
+            run_id = json.loads(content)["id"]
+            return await call(server, "GET", f"/runs/{run_id}/stream")
+
+        status, headers, content = asyncio.run(scenario())
+        assert status == 200
+        assert headers[b"content-type"] == b"text/event-stream"
+        assert b'"status": "succeeded"' in content
+        assert b"event: result" in content
+
+    @pytest.mark.unit
+    def test_failed_run(self, tmp_path):
+        """Test that runner exceptions mark the run as failed."""
+
+        def broken_runner(**kwargs):
+            raise RuntimeError("boom")
+
+        server = EngineeringTeamServer(runner=broken_runner, output_dir=tmp_path)
+
+        async def scenario():
+            _, _, content = await call(server, "POST", "/runs", {"requirements": "r"})
+            return await wait_until_done(server, json.loads(content)["id"])
+
+        data = asyncio.run(scenario())
+        assert data["status"] == "failed"
+        assert data["error"] == "boom"
+
+    @pytest.mark.unit
+    def test_unknown_run(self, server):
+        """Test requesting a run that does not exist."""
+        status, _, _ = asyncio.run(call(server, "GET", "/runs/missing"))
+        assert status == 404
+
+    @pytest.mark.unit
+    def test_each_run_gets_its_own_directory(self, server, fake_runner):
+        """Test that repeated identical requests do not share an output directory."""
+
+        async def scenario():
+            ids = []
+            for _ in range(2):
+                _, _, content = await call(server, "POST", "/runs", {"requirements": "r"})
+                ids.append(json.loads(content)["id"])
+                await wait_until_done(server, ids[-1])
+            return ids
+
+        ids = asyncio.run(scenario())
+        assert ids[0] != ids[1]
+        assert [Path(c["output_dir"]).name for c in fake_runner.calls] == ids
+
+    @pytest.mark.unit
+    def test_finished_jobs_are_pruned(self, fake_runner, tmp_path):
+        """Test that only the newest finished runs are kept."""
+        server = EngineeringTeamServer(
+            runner=fake_runner, output_dir=tmp_path / "runs", max_finished_jobs=1
+        )
+
+        async def scenario():
+            ids = []
+            for requirements in ("first", "second"):
+                _, _, content = await call(server, "POST", "/runs", {"requirements": requirements})
+                ids.append(json.loads(content)["id"])
+                await wait_until_done(server, ids[-1])
+            return ids
+
+        first, second = asyncio.run(scenario())
+        assert list(server.jobs) == [second]
+        assert asyncio.run(call(server, "GET", f"/runs/{first}"))[0] == 404
+
+    @pytest.mark.unit
+    def test_expired_jobs_are_pruned(self, fake_runner, tmp_path):
+        """Test that finished runs are forgotten after their TTL."""
+        server = EngineeringTeamServer(
+            runner=fake_runner, output_dir=tmp_path / "runs", job_ttl_seconds=0
+        )
+
+        async def scenario():
+            _, _, content = await call(server, "POST", "/runs", {"requirements": "r"})
+            run_id = json.loads(content)["id"]
+            while run_id in server.jobs:
+                await asyncio.sleep(0.01)
+
+        asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+        assert server.jobs == {}
+
+    @pytest.mark.integration
+    def test_run_through_real_crew(self, tmp_path, monkeypatch):
+        """Test a run end to end through run() and the crew, with a fake provider."""
+        monkeypatch.setattr(litellm, "completion", fake_completion)
+        monkeypatch.setattr(crew, "ENABLE_CODE_EXECUTION", False)
+        monkeypatch.setenv("CREWAI_DISABLE_TELEMETRY", "true")
+        monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+        server = EngineeringTeamServer(output_dir=tmp_path / "runs")
+
+        async def scenario():
+            _, _, content = await call(server, "POST", "/runs", {"requirements": "r"})
+            run_id = json.loads(content)["id"]
+            data = await wait_until_done(server, run_id)
+            _, _, artifacts = await call(server, "GET", f"/runs/{run_id}/artifacts")
+            return run_id, data, json.loads(artifacts)["artifacts"]
+
+        run_id, data, artifacts = asyncio.run(scenario())
+        assert data["status"] == "succeeded", data.get("error")
+        assert data["result"] == "class Account:\n    pass"
+        assert data["metrics"]["successful_requests"] == 4
+        assert {"accounts.py", "test_accounts.py", "app.py"} <= set(artifacts)
+        assert (tmp_path / "runs" / run_id / "accounts.py").exists()
@@ -0,0 +1,321 @@
+"""Unit tests for run tracing and replay."""
+
+import gzip
+import json
+import os
+
+import litellm
+import pytest
+from crewai.tools.structured_tool import CrewStructuredTool
+
+from engineering_team_agent import crew, main, profiling, selection
+from engineering_team_agent.tools.code_interpreter import BoundedCodeInterpreterTool
+from engineering_team_agent.tracing import (
+    ReplayEngine,
+    TraceMismatchError,
+    TraceRecorder,
+    load_trace,
+    replay,
+    summarize,
+)
+
+SYSTEM = {"role": "system", "content": "You are a Python Engineer."}
+FINAL_ANSWER = "Thought: I now can give a great answer\nFinal Answer: class Account:\n    pass\n"
+
+
+def fake_completion(model, messages, **kwargs):
+    """Stand-in provider answering with the last user message reversed."""
+    return litellm.ModelResponse(
+        model=model,
+        choices=[
+            {
+                "message": {"role": "assistant", "content": messages[-1]["content"][::-1]},
+                "finish_reason": "stop",
+            }
+        ],
+        usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    )
+
+
+def crew_completion(model, messages, **kwargs):
+    """Stand-in provider giving every agent the same final answer."""
+    return litellm.ModelResponse(
+        model=model,
+        choices=[
+            {"message": {"role": "assistant", "content": FINAL_ANSWER}, "finish_reason": "stop"}
+        ],
+        usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    )
+
+
+def lane_completion(model, messages, **kwargs):
+    """Stand-in provider giving the first best-of-N candidate a module that does not parse."""
+    content = FINAL_ANSWER
+    if (kwargs.get("metadata") or {}).get("lane") == "candidate-0":
+        content = content.replace("class Account:", "class Account(:")
+    return litellm.ModelResponse(
+        model=model,
+        choices=[{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    )
+
+
+def offline(*args, **kwargs):
+    """Stand-in for anything that must not run during replay."""
+    raise AssertionError("recomputed during replay")
+
+
+def complete(prompt, model="anthropic/claude-3-7-sonnet-latest", lane=None):
+    """Make a completion the way crewai does."""
+    response = litellm.completion(
+        model=model,
+        messages=[SYSTEM, {"role": "user", "content": prompt}],
+        metadata={"lane": lane} if lane else None,
+    )
+    return response.choices[0].message.content
+
+
+@pytest.fixture
+def recorded_trace(tmp_path, monkeypatch):
+    """Record two completions against the fake provider."""
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    path = tmp_path / "run.jsonl.gz"
+    with TraceRecorder(path, {"run": {"requirements": "r"}}):
+        complete("design")
+        complete("code")
+    return path
+
+
+class TestTracing:
+    """Test cases for tracing module."""
+
+    @pytest.mark.unit
+    def test_recorder_writes_compact_trace(self, recorded_trace):
+        """Test that calls are recorded and repeated messages stored once."""
+        trace = load_trace(recorded_trace)
+
+        assert trace["header"]["run"] == {"requirements": "r"}
+        assert [r["response"]["content"] for r in trace["llm"]] == ["ngised", "edoc"]
+        # The shared system message is stored once
+        assert len(trace["blobs"]) == 3
+        assert trace["end"]["success"] is True
+
+        with gzip.open(recorded_trace, "rt") as f:
+            assert all(json.loads(line)["type"] for line in f)
+
+    @pytest.mark.unit
+    def test_recorder_restores_completion(self, recorded_trace):
+        """Test that recording leaves litellm unpatched afterwards."""
+        assert litellm.completion is fake_completion
+
+    @pytest.mark.unit
+    def test_replay_serves_recorded_responses(self, recorded_trace, monkeypatch):
+        """Test that replay answers from the trace without calling the provider."""
+
+        def offline(*args, **kwargs):
+            raise AssertionError("network call during replay")
+
+        monkeypatch.setattr(litellm, "completion", offline)
+        with ReplayEngine(load_trace(recorded_trace), strict=True) as engine:
+            assert complete("code") == "edoc"
+            assert complete("design") == "ngised"
+
+        assert engine.stats["llm_calls"] == 2
+        assert engine.stats["mismatches"] == 0
+        assert litellm.completion is offline
+
+    @pytest.mark.unit
+    def test_strict_replay_rejects_unknown_request(self, recorded_trace):
+        """Test that strict replay fails on a request that was not recorded."""
+        with ReplayEngine(load_trace(recorded_trace), strict=True), pytest.raises(
+            TraceMismatchError
+        ):
+            complete("something else")
+
+    @pytest.mark.unit
+    def test_lenient_replay_falls_back_to_recorded_order(self, recorded_trace):
+        """Test that lenient replay serves the next recording for the same model."""
+        with ReplayEngine(load_trace(recorded_trace)) as engine:
+            assert complete("something else") == "ngised"
+            assert complete("code") == "edoc"
+            with pytest.raises(TraceMismatchError):
+                complete("design")
+
+        assert engine.stats["mismatches"] == 2
+
+    @pytest.mark.unit
+    def test_replay_matches_identical_requests_by_lane(self, tmp_path, monkeypatch):
+        """Test that identical prompts from different lanes get their own responses back."""
+        monkeypatch.setattr(litellm, "completion", lane_completion)
+        path = tmp_path / "run.jsonl.gz"
+        with TraceRecorder(path):
+            recorded = {lane: complete("code", lane=lane) for lane in ("candidate-0", "candidate-1")}
+
+        assert recorded["candidate-0"] != recorded["candidate-1"]
+        assert [r["lane"] for r in load_trace(path)["llm"]] == ["candidate-0", "candidate-1"]
+
+        monkeypatch.setattr(litellm, "completion", offline)
+        with ReplayEngine(load_trace(path), strict=True) as engine:
+            # Asked in the opposite order to the recording
+            assert complete("code", lane="candidate-1") == recorded["candidate-1"]
+            assert complete("code", lane="candidate-0") == recorded["candidate-0"]
+            with pytest.raises(TraceMismatchError):
+                complete("code")
+
+        assert engine.stats["mismatches"] == 0
+
+    @pytest.mark.unit
+    def test_tool_calls_are_recorded_and_replayed(self, tmp_path):
+        """Test that crewai tool calls are served from the trace, matched by lane and input."""
+        calls = []
+
+        def run_code(code: str) -> str:
+            """Run Python code."""
+            calls.append(code)
+            return f"ran {code}"
+
+        tool = CrewStructuredTool.from_function(run_code, name="Code Interpreter")
+        tool._original_tool = BoundedCodeInterpreterTool(lane="candidate-0")
+        path = tmp_path / "run.jsonl.gz"
+        with TraceRecorder(path):
+            assert tool.invoke(input={"code": "print(1)"}) == "ran print(1)"
+
+        trace = load_trace(path)
+        assert [(r["tool"], r["lane"], r["output"]) for r in trace["tool"]] == [
+            ("Code Interpreter", "candidate-0", "ran print(1)")
+        ]
+
+        with ReplayEngine(trace, strict=True) as engine:
+            assert tool.invoke(input={"code": "print(1)"}) == "ran print(1)"
+            with pytest.raises(TraceMismatchError):
+                tool.invoke(input={"code": "print(2)"})
+
+        assert calls == ["print(1)"]
+        assert engine.stats["tool_calls"] == 1
+
+    @pytest.mark.unit
+    def test_replay_restores_environment(self, recorded_trace, monkeypatch):
+        """Test that the offline switches only apply while the replay runs."""
+        monkeypatch.delenv("LITELLM_LOCAL_MODEL_COST_MAP", raising=False)
+        monkeypatch.setenv("CREWAI_DISABLE_TELEMETRY", "false")
+        seen = {}
+
+        def fake_run(**kwargs):
+            seen.update(os.environ)
+            return {"success": True}
+
+        monkeypatch.setattr(main, "run", fake_run)
+        replay(recorded_trace)
+
+        assert seen["LITELLM_LOCAL_MODEL_COST_MAP"] == "True"
+        # Explicit settings are respected
+        assert seen["CREWAI_DISABLE_TELEMETRY"] == "false"
+        assert "LITELLM_LOCAL_MODEL_COST_MAP" not in os.environ
+
+    @pytest.mark.unit
+    def test_failing_callback_is_logged(self, recorded_trace, monkeypatch, caplog):
+        """Test that a callback failing on a replayed response is logged, not hidden."""
+
+        class BrokenCallback:
+            def log_success_event(self, *args):
+                raise RuntimeError("broken")
+
+        monkeypatch.setattr(litellm, "callbacks", [BrokenCallback()])
+        with ReplayEngine(load_trace(recorded_trace), strict=True):
+            assert complete("code") == "edoc"
+
+        assert "failed during replay" in caplog.text
+
+    @pytest.mark.unit
+    def test_summarize(self, recorded_trace):
+        """Test per-model aggregation of a trace."""
+        summary = summarize(load_trace(recorded_trace))
+        model = summary["models"]["anthropic/claude-3-7-sonnet-latest"]
+
+        assert model["calls"] == 2
+        assert model["prompt_tokens"] == 20
+        assert model["completion_tokens"] == 10
+
+    @pytest.mark.unit
+    def test_local_results_are_recorded_and_replayed(self, tmp_path, monkeypatch):
+        """Test that candidate scores are served from the trace, nested profiling included."""
+        candidate = tmp_path / "candidates" / "0" / "accounts.py"
+        candidate.parent.mkdir(parents=True)
+        candidate.write_text("class Account:\n    pass\n")
+        reference_dir = tmp_path / "reference"
+        reference_dir.mkdir()
+        (reference_dir / "bench_accounts.py").write_text("def workloads():\n    return {}\n")
+        path = tmp_path / "run.jsonl.gz"
+
+        with TraceRecorder(path):
+            score = selection.score_candidate(candidate, "Account", reference_dir)
+
+        trace = load_trace(path)
+        # The benchmark run inside scoring is part of the recorded score
+        assert [(r["function"], r["key"]) for r in trace["result"]] == [("score_candidate", "0")]
+
+        monkeypatch.setattr(profiling, "profile_module", offline)
+        monkeypatch.setattr(selection, "score_candidate", offline)
+        with ReplayEngine(trace, strict=True) as engine:
+            replayed = selection.score_candidate(candidate, "Account", reference_dir)
+
+        assert replayed["within_budget"] == score["within_budget"]
+        assert selection.select_best([selection.failed_score("x"), replayed]) == 1
+        assert engine.stats["results"] == 1
+
+    @pytest.mark.integration
+    def test_replay_run_end_to_end(self, tmp_path, monkeypatch):
+        """Test replaying a recorded best-of-N run with profiling, fully offline."""
+        monkeypatch.setattr(litellm, "completion", crew_completion)
+        monkeypatch.setattr(crew, "ENABLE_CODE_EXECUTION", True)
+        trace_path = tmp_path / "run.jsonl.gz"
+        recorded = main.run(
+            "r",
+            output_dir=str(tmp_path / "recorded"),
+            profile=True,
+            candidates=2,
+            trace_path=str(trace_path),
+        )
+        assert recorded["success"] is True, recorded.get("error")
+
+        monkeypatch.setattr(litellm, "completion", offline)
+        monkeypatch.setattr(profiling, "profile_module", offline)
+        monkeypatch.setattr(selection, "score_candidate", offline)
+        replayed = replay(trace_path, output_dir=str(tmp_path / "replayed"), strict=True)
+
+        assert replayed["success"] is True, replayed.get("error")
+        trace = load_trace(trace_path)
+        functions = [record["function"] for record in trace["result"]]
+        assert sorted(functions) == ["profile_module", "score_candidate", "score_candidate"]
+        assert replayed["replay"]["llm_calls"] == len(trace["llm"])
+        assert replayed["replay"]["results"] == len(trace["result"])
+        assert replayed["replay"]["mismatches"] == 0
+        assert replayed["selection"]["winner"] == recorded["selection"]["winner"]
+        assert replayed["performance"]["report"] == recorded["performance"]["report"]
+        assert (tmp_path / "replayed" / "accounts.py").read_text() == (
+            tmp_path / "recorded" / "accounts.py"
+        ).read_text()
+
+    @pytest.mark.integration
+    def test_replay_best_of_n_with_different_candidates(self, tmp_path, monkeypatch):
+        """Test that each candidate is replayed with its own responses, keeping the winner."""
+        monkeypatch.setattr(litellm, "completion", lane_completion)
+        monkeypatch.setattr(crew, "ENABLE_CODE_EXECUTION", False)
+        trace_path = tmp_path / "run.jsonl.gz"
+        recorded = main.run(
+            "r", output_dir=str(tmp_path / "recorded"), candidates=2, trace_path=str(trace_path)
+        )
+        assert recorded["success"] is True, recorded.get("error")
+        assert recorded["selection"]["winner"] == 1
+
+        monkeypatch.setattr(litellm, "completion", offline)
+        monkeypatch.setattr(selection, "score_candidate", offline)
+        replayed = replay(trace_path, output_dir=str(tmp_path / "replayed"), strict=True)
+
+        assert replayed["success"] is True, replayed.get("error")
+        assert replayed["replay"]["mismatches"] == 0
+        assert replayed["selection"]["winner"] == 1
+        assert [score["parses"] for score in replayed["selection"]["scores"]] == [False, True]
+        assert (tmp_path / "replayed" / "accounts.py").read_text() == (
+            tmp_path / "recorded" / "accounts.py"
+        ).read_text()